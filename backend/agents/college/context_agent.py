@@ -1,13 +1,13 @@
 from agents.state import CollegeAgentState
 from agents.tools.firestore_tool import get_user_profile
 
-def academic_context_agent(state: CollegeAgentState) -> CollegeAgentState:
-    profile = get_user_profile(state["userId"])
+async def academic_context_agent(state: CollegeAgentState) -> dict:
+    profile = await get_user_profile(state["user_id"])
 
+    # Onboarding stores the degree as "course" and the subjects as "academic_subjects"
     return {
-        **state,
-        "degree": profile.get("degree"),
+        "degree": profile.get("degree") or profile.get("course"),
         "branch": profile.get("branch"),
         "semester": profile.get("semester"),
-        "subjects": profile.get("subjects", [])
+        "subjects": profile.get("academic_subjects") or profile.get("subjects", [])
     }
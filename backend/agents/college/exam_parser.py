@@ -1,14 +1,29 @@
+import asyncio
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional
+from langchain_core.runnables import RunnableConfig
 from agents.state import CollegeAgentState
-from agents.schemas import ExamInfo
-from utils.llm import llm
+from agents.schemas import ExamInfo, ExamInfoList
+from agents.tools.exam_extractor import CONFIDENCE_THRESHOLD, extract_exam, find_dates
+from utils.llm_utils import ainvoke_structured
+from utils.route_utils import get_user_subjects
+from utils.text_chunker import chunk_pages
 
+# Timetables longer than this are split across concurrent calls
+BATCH_CHUNK_TOKENS = int(os.getenv("EXAM_BATCH_CHUNK_TOKENS", "1500"))
+BATCH_CONCURRENCY = int(os.getenv("EXAM_BATCH_CONCURRENCY", "4"))
 
-def exam_parser_agent(state: CollegeAgentState) -> CollegeAgentState:
+
+async def exam_parser_agent(state: CollegeAgentState, config: RunnableConfig) -> dict:
     """Parse exam information from user input using structured output"""
     raw = state.get("input", "")
     
-    # Create structured output LLM
-    structured_llm = llm.with_structured_output(ExamInfo)
+    # Announcements the local extractor is sure about never reach the LLM
+    exam_info, confidence = extract_exam(raw, await get_user_subjects(state["user_id"], default=[]))
+    if exam_info is not None and confidence >= CONFIDENCE_THRESHOLD:
+        return {"exam": exam_info.model_dump()}
     
     prompt = f"""
     Extract exam information from the following text.
@@ -22,14 +37,17 @@ def exam_parser_agent(state: CollegeAgentState) -> CollegeAgentState:
     """
     
     try:
-        # Get structured output directly as ExamInfo object
-        exam_info: ExamInfo = structured_llm.invoke(prompt)
+        # Relative dates ("next Friday") depend on today, so never reuse answers
+        exam_info: ExamInfo = await ainvoke_structured(ExamInfo, prompt, cache=False)
         
         # Convert Pydantic model to dict for state
         parsed = exam_info.model_dump()
         
     except Exception as e:
         print(f"Error parsing exam: {e}")
+        if config.get("configurable", {}).get("strict"):
+            # Checkpointed runs record the failure so the step can be resumed
+            raise
         # Fallback with default values
         parsed = {
             "subject": "Unknown",
@@ -37,15 +55,21 @@ def exam_parser_agent(state: CollegeAgentState) -> CollegeAgentState:
             "topics": []
         }
     
-    return {**state, "exam": parsed}
+    return {"exam": parsed}
 
 
-def parse_exam_info(input_text: str) -> ExamInfo:
+async def parse_exam_info(input_text: str, subjects: Optional[List[str]] = None) -> ExamInfo:
     """
     Standalone function to parse exam info from text.
     Used by routes that need direct access without agent state.
+    
+    Args:
+        input_text: Exam announcement
+        subjects: The user's academic subjects; enables the local fast path
     """
-    structured_llm = llm.with_structured_output(ExamInfo)
+    exam_info, confidence = extract_exam(input_text, subjects or [])
+    if exam_info is not None and confidence >= CONFIDENCE_THRESHOLD:
+        return exam_info
     
     prompt = f"""
     Extract exam information from the following text.
@@ -59,7 +83,8 @@ def parse_exam_info(input_text: str) -> ExamInfo:
     """
     
     try:
-        exam_info: ExamInfo = structured_llm.invoke(prompt)
+        # Relative dates ("next Friday") depend on today, so never reuse answers
+        exam_info: ExamInfo = await ainvoke_structured(ExamInfo, prompt, cache=False)
         return exam_info
     except Exception as e:
         print(f"Error parsing exam: {e}")
@@ -72,3 +97,119 @@ def parse_exam_info(input_text: str) -> ExamInfo:
             days_until_exam=7,
             urgency="medium"
         )
+
+
+def build_batch_prompt(text: str, subjects: List[str]) -> str:
+    return f"""
+    Extract every exam announced in the following text (for example a semester timetable).
+    
+    For each exam identify:
+    - The subject name{f" (use the matching name from: {', '.join(subjects)})" if subjects else ""}
+    - The exam date (format as YYYY-MM-DD; today is {datetime.now().strftime('%Y-%m-%d')})
+    - The topics to be covered (as a list, empty if none are given)
+    
+    Return one entry per exam, in the order they appear.
+    
+    Text: {text}
+    """
+
+
+# A line that only continues the announcement above it ("Topics: ...", "- joins")
+CONTINUATION_LINE = re.compile(r"^\s*(?:[-*\u2022]|(?:topics?|syllabus|chapters?|cover(?:s|ing)?|portions?)\b)", re.I)
+
+
+def split_announcements(text: str) -> List[str]:
+    """
+    Split a block into announcements: one per line, plus the topic lines that follow it.
+    
+    Blank lines end an announcement; lines starting with a topic cue or a
+    bullet belong to the announcement above them unless they carry their own
+    date (a bulleted timetable is one announcement per bullet).
+    """
+    today = date.today()
+    announcements = []
+    current = []
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                announcements.append("\n".join(current))
+                current = []
+        elif current and CONTINUATION_LINE.match(line) and not find_dates(line, today):
+            current.append(line)
+        else:
+            if current:
+                announcements.append("\n".join(current))
+            current = [line]
+    if current:
+        announcements.append("\n".join(current))
+    return announcements
+
+
+async def parse_exam_batch(input_text: str, subjects: Optional[List[str]] = None) -> List[ExamInfo]:
+    """
+    Parse a block announcing several exams.
+    
+    The block is split into announcements (a line plus any topic lines under
+    it). Announcements the local extractor is sure about are taken as-is; each
+    run of the others goes to one structured-output call returning every exam
+    in it, split into concurrent calls when the text is long.
+    
+    Args:
+        input_text: Pasted timetable or announcements
+        subjects: The user's academic subjects
+    
+    Returns:
+        Exams in text order, without exact duplicates
+    """
+    subjects = subjects or []
+    # Parts in text order: (announcement, ExamInfo) parsed locally, or the index of an LLM chunk
+    parts = []
+    chunks: List[str] = []
+    pending: List[str] = []
+    
+    def flush_pending():
+        for chunk in chunk_pages(pending, BATCH_CHUNK_TOKENS):
+            parts.append(len(chunks))
+            chunks.append(chunk)
+        pending.clear()
+    
+    for announcement in split_announcements(input_text):
+        exam_info, confidence = extract_exam(announcement, subjects)
+        if exam_info is not None and confidence >= CONFIDENCE_THRESHOLD:
+            flush_pending()
+            parts.append((announcement, exam_info))
+        else:
+            pending.append(announcement)
+    flush_pending()
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def parse_chunk(chunk: str) -> ExamInfoList:
+        async with semaphore:
+            # Relative dates depend on today, so never reuse answers
+            return await ainvoke_structured(ExamInfoList, build_batch_prompt(chunk, subjects), cache=False)
+    
+    results = await asyncio.gather(*(parse_chunk(c) for c in chunks), return_exceptions=True)
+    for i, r in enumerate(results):
+        if isinstance(r, Exception):
+            print(f"Exam batch chunk {i + 1}/{len(chunks)} failed: {r}")
+    if chunks and len(parts) == len(chunks) and all(isinstance(r, Exception) for r in results):
+        raise results[0]
+    
+    # Only exact repeats are dropped: a line pasted twice, or an identical entry from the LLM.
+    # Two exams of a subject on one day (theory and practical) both stay.
+    seen = set()
+    exams: List[ExamInfo] = []
+    for part in parts:
+        if isinstance(part, tuple):
+            keyed = [(" ".join(part[0].lower().split()), part[1])]
+        elif isinstance(results[part], Exception):
+            continue
+        else:
+            keyed = [((exam.subject.strip().lower(), exam.exam_date, tuple(t.strip().lower() for t in exam.topics)), exam)
+                     for exam in results[part].exams]
+        for key, exam in keyed:
+            if key not in seen:
+                seen.add(key)
+                exams.append(exam)
+    return exams
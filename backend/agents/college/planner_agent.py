@@ -1,17 +1,27 @@
+from langchain_core.runnables import RunnableConfig
 from agents.state import CollegeAgentState
 from agents.schemas import StudyPlan
-from utils.llm import llm
+from utils.llm_utils import ainvoke_structured
 
 
-def planner_agent(state: CollegeAgentState) -> CollegeAgentState:
+async def planner_agent(state: CollegeAgentState, config: RunnableConfig) -> dict:
     """Create a study plan based on exam details and urgency using structured output"""
     
     urgency = state.get("urgency", "medium")
     topics = state.get("exam", {}).get("topics", [])
     days_left = state.get("days_left", 7)
     
-    # Create structured output LLM
-    structured_llm = llm.with_structured_output(StudyPlan)
+    # Academic context read by the context node alongside the exam parse
+    student = [
+        f"- {label}: {value}" for label, value in (
+            ("Degree", state.get("degree")),
+            ("Branch", state.get("branch")),
+            ("Semester", state.get("semester")),
+            ("Other subjects this term", ", ".join(s for s in state.get("subjects") or []
+                                                    if s != state.get("exam", {}).get("subject"))),
+        ) if value
+    ]
+    student_context = "\n    ".join(student)
     
     prompt = f"""
     Create a structured study plan for the following context:
@@ -19,12 +29,14 @@ def planner_agent(state: CollegeAgentState) -> CollegeAgentState:
     - Urgency level: {urgency}
     - Topics to cover: {', '.join(topics) if topics else 'General review'}
     - Days remaining: {days_left}
+    {student_context}
     
     Requirements:
     - Create a day-by-day plan with specific tasks for each day
     - Estimate the total hours needed
     - Identify priority topics that need the most focus
     - Make the plan realistic and achievable based on the urgency level
+    - Pitch tasks at the student's degree and semester, leaving time for their other subjects
     
     For {urgency} urgency:
     - critical: Intensive study sessions, focus on key concepts
@@ -35,13 +47,16 @@ def planner_agent(state: CollegeAgentState) -> CollegeAgentState:
     
     try:
         # Get structured output directly as StudyPlan object
-        study_plan: StudyPlan = structured_llm.invoke(prompt)
+        study_plan: StudyPlan = await ainvoke_structured(StudyPlan, prompt)
         
         # Convert Pydantic model to dict for state
         plan = study_plan.model_dump()
         
     except Exception as e:
         print(f"Error creating plan: {e}")
+        if config.get("configurable", {}).get("strict"):
+            # Checkpointed runs record the failure so the step can be resumed
+            raise
         # Fallback plan
         plan = {
             "daily_plan": [
@@ -52,16 +67,14 @@ def planner_agent(state: CollegeAgentState) -> CollegeAgentState:
             "priority_topics": topics[:3] if topics else []
         }
     
-    return {**state, "plan": plan}
+    return {"plan": plan}
 
 
-def create_study_plan(exam_info) -> StudyPlan:
+async def create_study_plan(exam_info) -> StudyPlan:
     """
     Standalone function to create a study plan from exam info.
     Used by routes that need direct access without agent state.
     """
-    structured_llm = llm.with_structured_output(StudyPlan)
-    
     # Extract info from ExamInfo object
     if hasattr(exam_info, 'topics'):
         topics = exam_info.topics
@@ -85,6 +98,7 @@ def create_study_plan(exam_info) -> StudyPlan:
     - Estimate the total hours needed
     - Identify priority topics that need the most focus
     - Make the plan realistic and achievable based on the urgency level
+    - Pitch tasks at the student's degree and semester, leaving time for their other subjects
     
     For {urgency} urgency:
     - critical: Intensive study sessions, focus on key concepts
@@ -94,7 +108,7 @@ def create_study_plan(exam_info) -> StudyPlan:
     """
     
     try:
-        study_plan: StudyPlan = structured_llm.invoke(prompt)
+        study_plan: StudyPlan = await ainvoke_structured(StudyPlan, prompt)
         return study_plan
     except Exception as e:
         print(f"Error creating plan: {e}")
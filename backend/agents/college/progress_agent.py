@@ -1,10 +1,16 @@
 from agents.state import CollegeAgentState
-from agents.tools.firestore_tool import get_user_progress
+from agents.tools.firestore_tool import count_user_progress, get_user_progress
 
-def progress_agent(state: CollegeAgentState) -> CollegeAgentState:
-    history = get_user_progress(state["userId"])
+async def progress_agent(state: CollegeAgentState) -> dict:
+    # Runs alongside exam parsing, so `behind` is decided by the strategy node once days_left is known
+    update = { "completed_sessions": await count_user_progress(state["user_id"]) }
 
-    completion_rate = len(history) / max(state["days_left"], 1)
-    behind = completion_rate < 0.6
+    # Full history is only loaded when the caller asks for it
+    if state.get("include_history"):
+        update["progress_history"] = await get_user_progress(state["user_id"])
 
-    return { **state, "progress_history": history, "behind": behind }
+    return update
+
+def is_behind(completed_sessions: int, days_left: int) -> bool:
+    completion_rate = completed_sessions / max(days_left, 1)
+    return completion_rate < 0.6
@@ -1,11 +1,14 @@
 from agents.state import CollegeAgentState
+from agents.college.progress_agent import is_behind
+
+def strategy_agent(state: CollegeAgentState) -> dict:
+    behind = is_behind(state.get("completed_sessions", 0), state["days_left"])
 
-def strategy_agent(state: CollegeAgentState) -> CollegeAgentState:
     if state["urgency"] == "critical":
         strategy = "cram_mode"
-    elif state["behind"]:
+    elif behind:
         strategy = "intensify"
     else:
         strategy = "normal"
 
-    return { **state, "strategy": strategy }
+    return { "behind": behind, "strategy": strategy }
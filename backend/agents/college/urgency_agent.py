@@ -1,7 +1,7 @@
 from agents.state import CollegeAgentState
 from agents.tools.date_tool import calculate_days_left
 
-def urgency_agent(state: CollegeAgentState) -> CollegeAgentState:
+def urgency_agent(state: CollegeAgentState) -> dict:
     days = calculate_days_left(state["exam"]["exam_date"])
 
     urgency = (
@@ -11,4 +11,4 @@ def urgency_agent(state: CollegeAgentState) -> CollegeAgentState:
         "low"
     )
 
-    return { **state, "days_left": days, "urgency": urgency }
+    return { "days_left": days, "urgency": urgency }
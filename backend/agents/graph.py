@@ -1,4 +1,4 @@
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, START, END
 from agents.state import CollegeAgentState
 
 from agents.college.exam_parser import exam_parser_agent
@@ -17,12 +17,17 @@ builder.add_node("planner", planner_agent)
 builder.add_node("progress", progress_agent)
 builder.add_node("strategy", strategy_agent)
 
-builder.set_entry_point("parse_exam")
-
+# Fan out: the Firestore reads for context and progress only need the user id,
+# so they run while the exam is parsed (the LLM call) and its urgency computed
+builder.add_edge(START, "parse_exam")
+builder.add_edge(START, "context")
+builder.add_edge(START, "progress")
 builder.add_edge("parse_exam", "urgency")
-builder.add_edge("urgency", "context")
-builder.add_edge("context", "planner")
-builder.add_edge("planner", "progress")
-builder.add_edge("progress", "strategy")
+
+# Join: planner and strategy wait for all three branches, then run side by side
+builder.add_edge(["urgency", "context", "progress"], "planner")
+builder.add_edge(["urgency", "context", "progress"], "strategy")
+builder.add_edge("planner", END)
+builder.add_edge("strategy", END)
 
 college_graph = builder.compile()
@@ -0,0 +1,224 @@
+"""
+Checkpointed, resumable ``college_graph`` runs.
+
+Each run is a LangGraph thread keyed by its run id. After every step, the
+checkpointer saves the state to a local SQLite file (GRAPH_CHECKPOINT_DB,
+default ``graph_checkpoints.sqlite3``). When a run fails or times out,
+resuming it re-executes only the nodes that hadn't completed. The exam is
+not re-parsed with another LLM call when only the planner failed. Resumable
+runs are strict: LLM nodes raise instead of substituting a fallback, so the
+failure is recorded and can be retried.
+
+Which run is executing is recorded in the same database (``graph_runs``)
+as a claim that expires shortly after RUN_TIMEOUT, so every worker sharing
+the file sees the same status and only one attempt runs at a time. A claim
+left behind by a worker that died simply expires. The file must be on a disk
+all workers share (one host); checkpoints of runs that finished more than
+GRAPH_RUN_RETENTION_HOURS ago are pruned.
+"""
+import asyncio
+import os
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from agents.graph import builder
+
+# Upper bound for one attempt; a timed-out run keeps its completed steps
+RUN_TIMEOUT = float(os.getenv("GRAPH_RUN_TIMEOUT_SECONDS", "120"))
+
+# A claim outlives the attempt by this much before another worker may take the run over
+CLAIM_GRACE_SECONDS = 30.0
+
+# Checkpoints of runs idle for longer than this are deleted
+RUN_RETENTION_SECONDS = float(os.getenv("GRAPH_RUN_RETENTION_HOURS", "24")) * 3600
+PRUNE_INTERVAL_SECONDS = 600.0
+
+_stack: Optional[AsyncExitStack] = None
+_saver: Optional[AsyncSqliteSaver] = None
+_graph = None
+_lock = asyncio.Lock()
+_last_prune = 0.0
+
+# Identifies this worker's claims
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+CLAIMS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graph_runs (
+    run_id TEXT PRIMARY KEY,
+    owner TEXT,
+    claimed_until REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+async def get_run_graph():
+    """The college graph compiled with the SQLite checkpointer (opened on first use)"""
+    global _stack, _saver, _graph
+    async with _lock:
+        if _graph is None:
+            stack = AsyncExitStack()
+            saver = await stack.enter_async_context(
+                AsyncSqliteSaver.from_conn_string(os.getenv("GRAPH_CHECKPOINT_DB", "graph_checkpoints.sqlite3"))
+            )
+            async with saver.lock:
+                await saver.conn.execute(CLAIMS_SCHEMA)
+                await saver.conn.commit()
+            _stack, _saver, _graph = stack, saver, builder.compile(checkpointer=saver)
+    return _graph
+
+
+async def close_run_store():
+    """Close the checkpoint database (app shutdown)"""
+    global _stack, _saver, _graph
+    async with _lock:
+        if _stack is not None:
+            await _stack.aclose()
+        _stack, _saver, _graph = None, None, None
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def _execute(sql: str, params: tuple) -> int:
+    """Run one statement on the checkpoint database; returns the number of rows changed"""
+    await get_run_graph()
+    async with _saver.lock:
+        cursor = await _saver.conn.execute(sql, params)
+        await _saver.conn.commit()
+        return cursor.rowcount
+
+
+async def claim_run(run_id: str) -> bool:
+    """
+    Mark a run as executing, across all workers sharing the checkpoint database.
+
+    Returns:
+        False if another attempt holds an unexpired claim (only one attempt at a time)
+    """
+    now = time.time()
+    changed = await _execute(
+        "INSERT INTO graph_runs (run_id, owner, claimed_until, updated_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(run_id) DO UPDATE SET owner = excluded.owner, claimed_until = excluded.claimed_until, "
+        "updated_at = excluded.updated_at WHERE graph_runs.claimed_until < ?",
+        (run_id, WORKER_ID, now + RUN_TIMEOUT + CLAIM_GRACE_SECONDS, now, now)
+    )
+    return changed > 0
+
+
+async def release_run(run_id: str):
+    """Drop this worker's claim on a run"""
+    await _execute(
+        "UPDATE graph_runs SET owner = NULL, claimed_until = 0, updated_at = ? WHERE run_id = ? AND owner = ?",
+        (time.time(), run_id, WORKER_ID)
+    )
+
+
+async def is_running(run_id: str) -> bool:
+    await get_run_graph()
+    async with _saver.lock:
+        async with _saver.conn.execute(
+            "SELECT 1 FROM graph_runs WHERE run_id = ? AND claimed_until >= ?", (run_id, time.time())
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+
+async def prune_runs(retention: float = RUN_RETENTION_SECONDS) -> int:
+    """
+    Delete the checkpoints of unclaimed runs idle for longer than ``retention`` seconds.
+
+    Returns:
+        Number of runs deleted
+    """
+    await get_run_graph()
+    now = time.time()
+    async with _saver.lock:
+        async with _saver.conn.execute(
+            "SELECT run_id FROM graph_runs WHERE claimed_until < ? AND updated_at < ?", (now, now - retention)
+        ) as cursor:
+            run_ids = [row[0] async for row in cursor]
+    for run_id in run_ids:
+        await _saver.adelete_thread(run_id)
+        await _execute("DELETE FROM graph_runs WHERE run_id = ? AND claimed_until < ?", (run_id, time.time()))
+    return len(run_ids)
+
+
+async def _maybe_prune():
+    global _last_prune
+    if time.monotonic() - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = time.monotonic()
+    try:
+        pruned = await prune_runs()
+        if pruned:
+            print(f"Pruned {pruned} finished graph runs")
+    except Exception as e:
+        print(f"Failed to prune graph runs: {e}")
+
+
+def _config(run_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": run_id, "strict": True}}
+
+
+async def execute_run(run_id: str, inputs: Optional[Dict[str, Any]] = None):
+    """
+    Start a run (with ``inputs``) or resume it from its last checkpoint (``inputs=None``).
+
+    The caller claims the run first with ``claim_run``; it is released when this returns.
+    Errors are recorded in the checkpoint and reported by ``get_run``, so this never raises.
+    """
+    try:
+        graph = await get_run_graph()
+        await asyncio.wait_for(graph.ainvoke(inputs, _config(run_id)), RUN_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"Graph run {run_id} timed out after {RUN_TIMEOUT}s")
+    except Exception as e:
+        print(f"Graph run {run_id} failed: {e}")
+    finally:
+        try:
+            await release_run(run_id)
+        except Exception as e:
+            # The claim expires on its own
+            print(f"Failed to release graph run {run_id}: {e}")
+        await _maybe_prune()
+
+
+async def get_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Current state of a run.
+
+    Returns:
+        Dict with ``status`` (running, failed, interrupted, completed), the pending ``next`` nodes,
+        any node ``errors`` and the state ``values``; None if the run doesn't exist
+    """
+    graph = await get_run_graph()
+    snapshot = await graph.aget_state(_config(run_id))
+    if not snapshot.values and snapshot.created_at is None:
+        return None
+
+    # Only pending nodes count: a sibling that finished before the failure is
+    # still listed with a cancellation error
+    errors = {task.name: str(task.error) for task in snapshot.tasks if task.error and task.name in snapshot.next}
+    if await is_running(run_id):
+        status = "running"
+    elif errors:
+        status = "failed"
+    elif snapshot.next:
+        # Stopped between steps (timeout or worker restart); resumable like a failure
+        status = "interrupted"
+    else:
+        status = "completed"
+
+    return {
+        "run_id": run_id,
+        "status": status,
+        "next": list(snapshot.next),
+        "errors": errors,
+        "values": snapshot.values,
+        "updated_at": snapshot.created_at
+    }
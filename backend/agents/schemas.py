@@ -22,6 +22,14 @@ class ExamInfo(BaseModel):
     )
 
 
+
+class ExamInfoList(BaseModel):
+    """Structured output for a block announcing several exams (e.g. a timetable)"""
+    exams: List[ExamInfo] = Field(
+        default_factory=list,
+        description="Every exam in the text, one entry per subject and date"
+    )
+
 # ============================================================================
 # Planner Agent Schemas
 # ============================================================================
@@ -12,6 +12,8 @@ class CollegeAgentState(TypedDict, total=False):
     semester: Optional[str]
     subjects: List[str]
     plan: Optional[dict]
+    completed_sessions: int
+    include_history: bool
     progress_history: List[dict]
     behind: bool
     strategy: Optional[str]
@@ -0,0 +1,263 @@
+"""
+Deterministic exam extraction, tried before the LLM.
+
+Short announcements such as "DBMS midterm on 2026-11-03: normalization,
+indexing, transactions" are parsed locally. Dates may be absolute
+(2026-11-03, 03/11/2026, 3rd Nov, November 3) or relative (tomorrow,
+in 2 weeks, next Friday). The subject is matched against the user's
+``academic_subjects`` by name or acronym, and topics come from the list
+after a cue such as ":" or "topics". Times and logistics ("at 10am in hall
+B, bring ID cards") are ignored; any other word the parse can't account for
+keeps the confidence below the threshold. ``extract_exam`` returns a
+confidence in [0, 1]; callers use the result only when it reaches
+EXAM_PARSE_CONFIDENCE_THRESHOLD and otherwise fall back to the LLM.
+"""
+import os
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from agents.schemas import ExamInfo
+
+CONFIDENCE_THRESHOLD = float(os.getenv("EXAM_PARSE_CONFIDENCE_THRESHOLD", "0.85"))
+
+# How much each part contributes to the confidence. With the default threshold an
+# unexplained remainder alone (at most DATE_WEIGHT + SUBJECT_WEIGHT = 0.7) sends the text to the LLM.
+DATE_WEIGHT = 0.4
+SUBJECT_WEIGHT = 0.3
+EXPLAINED_WEIGHT = 0.3
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_COUNT = r"\d+|" + "|".join(NUMBER_WORDS)
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b")
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH})\b\.?,?(?:\s+(\d{{4}}))?", re.I)
+MONTH_DAY = re.compile(rf"\b({_MONTH})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b,?(?:\s+(\d{{4}}))?", re.I)
+DAY_AFTER_TOMORROW = re.compile(r"\bday after tomorrow\b", re.I)
+TOMORROW = re.compile(r"\btomorrow\b", re.I)
+TODAY = re.compile(r"\btoday\b", re.I)
+IN_PERIOD = re.compile(rf"\bin\s+({_COUNT})\s+(day|week)s?\b", re.I)
+NAMED_WEEKDAY = re.compile(rf"\b(?:(next|this|coming|on)\s+)?({_WEEKDAY})\b\.?", re.I)
+
+# An announcement must name the assessment; "DBMS revision class tomorrow" is not one
+EXAM_WORD = re.compile(r"\b(?:exams?|tests?|quiz(?:zes)?|midterms?|mid-terms?|mid ?sems?|end ?sems?|finals?|"
+                       r"viva|practicals?|internals?|papers?)\b", re.I)
+# Texts that are about something else, retract an exam or hedge: always left to the LLM
+NOT_AN_ANNOUNCEMENT = re.compile(r"\b(?:no|not|isn'?t|won'?t|cancel(?:l?ed|lation)?|call(?:ed)? off|postpone[ds]?|"
+                                 r"prepone[ds]?|reschedule[ds]?|moved?|shifted|delayed|from|"
+                                 r"class(?:es)?|lectures?|assignments?|homework|submissions?|deadlines?|revision|"
+                                 r"tutorials?|seminars?|workshops?|projects?|"
+                                 r"might|maybe|probably|possibly|perhaps|likely|said|says|think|guess|tentative(?:ly)?|"
+                                 r"expected|sometime|soon)\b", re.I)
+
+# Times ("at 10:30", "9am") and logistics ("in hall B", "bring ID cards") are neither
+# topics nor unexplained text; they are blanked out before topics are read
+TIME = re.compile(r"\b(?:at\s+)?\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\b(?:at\s+)?\d{1,2}:\d{2}\b|\bat\s+\d{1,2}\b", re.I)
+LOGISTICS = re.compile(r"\b(?:in|at)\s+(?:the\s+)?(?:exam\s+)?(?:hall|room|block|auditorium|venue|lab)\b[^,;.:\n]*"
+                       r"|\b(?:bring|carry|report(?:ing)?|venue|seating|hall tickets?|admit cards?)\b[^,;.:\n]*", re.I)
+
+# A colon within a time ("10:30", "at 9:") is not a topic list, one after a full time ("10:30:") is
+TOPIC_CUE = re.compile(r"(?:\btopics?\b|\bsyllabus\b|\bchapters?\b|\bcover(?:s|ing)?\b)\s*:?"
+                       r"|(?<!\d):(?!\d)|(?<=\d:\d\d):", re.I)
+# "on X, Y" only introduces topics when no stronger cue is present
+WEAK_TOPIC_CUE = re.compile(r"\bon\b(?=[^:]*[,;])", re.I)
+TOPIC_SPLIT = re.compile(r"\s*(?:[,;/&\n]|\band\b)\s*", re.I)
+SENTENCE_END = re.compile(r"(?<![A-Za-z0-9])\.(?=\s|$)")
+# Longer fragments are prose rather than topic names
+MAX_TOPIC_WORDS = 5
+FILLER_WORDS = re.compile(r"\b(?:is|are|on|at|the|my|our|for|of|scheduled|will|be|have|has|"
+                          r"there|a|an|etc|due)\b", re.I)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def _names(subject: str) -> List[str]:
+    """Ways a subject is written: its name and acronyms ("Theory of Computation" -> "toc", "tc")"""
+    words = _normalize(subject).split()
+    names = {" ".join(words)}
+    if len(words) > 1:
+        names.add("".join(w[0] for w in words))
+        names.add("".join(w[0] for w in words if w not in ("and", "of", "the", "in", "to", "for")))
+    return [n for n in names if len(n) > 1]
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _upcoming(month: int, day: int, today: date) -> Optional[date]:
+    """Next occurrence of a month/day without a year (this year, or next if already past)"""
+    found = _safe_date(today.year, month, day)
+    if found and found < today:
+        found = _safe_date(today.year + 1, month, day)
+    return found
+
+
+def find_dates(text: str, today: date) -> List[Tuple[date, float, Tuple[int, int]]]:
+    """
+    Every date mentioned in the text.
+
+    Returns:
+        List of (date, confidence, span), in order of appearance
+    """
+    found = []
+    taken = []
+
+    def add(match, value: Optional[date], confidence: float):
+        span = match.span()
+        if value is None or any(s < span[1] and span[0] < e for s, e in taken):
+            return
+        taken.append(span)
+        found.append((value, confidence, span))
+
+    for m in ISO_DATE.finditer(text):
+        add(m, _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3))), 1.0)
+    for m in NUMERIC_DATE.finditer(text):
+        year = int(m.group(3))
+        # Day first, as students write it (03/11/2026 is 3 November)
+        add(m, _safe_date(year + 2000 if year < 100 else year, int(m.group(2)), int(m.group(1))), 0.9)
+    for m in DAY_MONTH.finditer(text):
+        month, day = MONTHS[m.group(2).lower()], int(m.group(1))
+        add(m, _safe_date(int(m.group(3)), month, day) if m.group(3) else _upcoming(month, day, today), 1.0)
+    for m in MONTH_DAY.finditer(text):
+        month, day = MONTHS[m.group(1).lower()], int(m.group(2))
+        add(m, _safe_date(int(m.group(3)), month, day) if m.group(3) else _upcoming(month, day, today), 1.0)
+    for m in DAY_AFTER_TOMORROW.finditer(text):
+        add(m, today + timedelta(days=2), 1.0)
+    for m in TOMORROW.finditer(text):
+        add(m, today + timedelta(days=1), 1.0)
+    for m in TODAY.finditer(text):
+        add(m, today, 1.0)
+    for m in IN_PERIOD.finditer(text):
+        count = m.group(1).lower()
+        count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        add(m, today + timedelta(days=count * (7 if m.group(2).lower() == "week" else 1)), 0.9)
+    for m in NAMED_WEEKDAY.finditer(text):
+        # "next/this/on Friday" and a bare "Friday" all mean the coming Friday (never today)
+        if not m.group(1) and len(m.group(2)) <= 4:
+            # A bare "sat"/"wed" is more likely a word than a date
+            continue
+        ahead = (WEEKDAYS[m.group(2).lower()] - today.weekday() - 1) % 7 + 1
+        add(m, today + timedelta(days=ahead), 0.9 if m.group(1) else 0.8)
+
+    return sorted(found, key=lambda f: f[2][0])
+
+
+def match_subjects(text: str, subjects: List[str]) -> List[Tuple[str, int]]:
+    """
+    The user's subjects mentioned in the text, by full name or acronym.
+
+    Returns:
+        List of (subject, position), in order of appearance
+    """
+    normalized = f" {_normalize(text)} "
+    matches = []
+    for subject in subjects:
+        positions = [normalized.find(f" {name} ") for name in _names(subject)]
+        positions = [p for p in positions if p >= 0]
+        if positions:
+            matches.append((subject, min(positions)))
+    return sorted(matches, key=lambda m: m[1])
+
+
+def _blank(text: str, spans: List[Tuple[int, int]]) -> str:
+    """Text with the spans replaced by spaces (positions are kept)"""
+    for start, end in spans:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return text
+
+
+def _topic_list(text: str) -> Tuple[List[str], Optional[Tuple[int, int]]]:
+    """Topics listed after a cue and the span of the cue plus list; ([], None) without a cue"""
+    cue = TOPIC_CUE.search(text) or WEAK_TOPIC_CUE.search(text)
+    if not cue:
+        return [], None
+    listed = SENTENCE_END.split(text[cue.end():])[0]
+    topics = []
+    for part in TOPIC_SPLIT.split(listed):
+        part = part.strip(" .-'\"()")
+        if part and part.lower() not in ("etc", "and", "or") and part not in topics:
+            topics.append(part)
+    return topics, (cue.start(), cue.end() + len(listed))
+
+
+def find_topics(text: str, spans: List[Tuple[int, int]]) -> List[str]:
+    """Topics listed after a cue (":" / "topics" / "covering" ...), with the given spans (dates) removed"""
+    return _topic_list(_blank(text, spans))[0]
+
+
+def _leftover_words(text: str, subject: str) -> List[str]:
+    """Words not explained by filler, exam words or the subject"""
+    text = _normalize(text)
+    # Subject first: filler words can be part of its name ("Theory of Computation")
+    for name in _names(subject):
+        text = re.sub(rf"\b{re.escape(name)}\b", " ", text)
+    return FILLER_WORDS.sub(" ", EXAM_WORD.sub(" ", text)).split()
+
+
+def extract_exam(text: str, subjects: List[str], today: Optional[date] = None) -> Tuple[Optional[ExamInfo], float]:
+    """
+    Parse an exam announcement without the LLM.
+
+    Args:
+        text: Announcement text
+        subjects: The user's academic subjects to match against
+        today: Reference date for relative dates (defaults to today)
+
+    Returns:
+        (ExamInfo or None, confidence). None when no date, subject or exam word was
+        found, or when the text is about something else, hedges, or cancels, negates
+        or reschedules an exam.
+    """
+    today = today or date.today()
+    if NOT_AN_ANNOUNCEMENT.search(text) or not EXAM_WORD.search(text):
+        return None, 0.0
+    dates = find_dates(text, today)
+    matched = match_subjects(text, subjects or [])
+    if not dates or not matched:
+        return None, 0.0
+
+    exam_date, date_confidence, _ = dates[0]
+    if len({d for d, _, _ in dates}) > 1:
+        # Several different dates: probably a timetable or a reschedule, leave it to the LLM
+        date_confidence *= 0.3
+    subject = matched[0][0]
+    subject_confidence = 1.0 if len(matched) == 1 else 0.3
+
+    # Dates, times and logistics are blanked out, then the topic list is read from what remains
+    spans = [span for _, _, span in dates]
+    spans += [m.span() for m in TIME.finditer(text)] + [m.span() for m in LOGISTICS.finditer(text)]
+    blanked = _blank(text, spans)
+    topics, region = _topic_list(blanked)
+    # Drop fragments that are only the subject or filler ("Exam: DBMS on 3 Nov")
+    topics = [t for t in topics if _leftover_words(t, subject)]
+
+    # Every word must be accounted for: a fragment too long to be a topic name, or any
+    # text outside the date, subject, exam words and topic list, means the parse is unsure
+    rest = _blank(blanked, [region]) if region else blanked
+    explained = not _leftover_words(rest, subject) and all(len(t.split()) <= MAX_TOPIC_WORDS for t in topics)
+
+    confidence = (DATE_WEIGHT * date_confidence + SUBJECT_WEIGHT * subject_confidence
+                  + EXPLAINED_WEIGHT * explained)
+    exam = ExamInfo(subject=subject, exam_date=exam_date.strftime("%Y-%m-%d"), topics=topics)
+    return exam, round(confidence, 3)
@@ -1,12 +1,17 @@
 from db.firebase import db
 
-def get_user_profile(user_id):
-    doc = db.collection("academic_profiles").document(user_id).get()
+async def get_user_profile(user_id):
+    doc = await db.collection("academic_profiles").document(user_id).get()
     return doc.to_dict() if doc.exists else {}
 
-def get_user_progress(user_id):
+async def get_user_progress(user_id):
     docs = db.collection("study_progress").where("userId", "==", user_id).stream()
-    return [doc.to_dict() for doc in docs]
+    return [doc.to_dict() async for doc in docs]
 
-def save_study_plan(user_id, plan):
-    db.collection("study_plans").add({ "userId": user_id, **plan })
+async def count_user_progress(user_id):
+    # Server-side count() aggregation: one round trip, no documents transferred
+    results = await db.collection("study_progress").where("userId", "==", user_id).count(alias="sessions").get()
+    return int(results[0][0].value) if results and results[0] else 0
+
+async def save_study_plan(user_id, plan):
+    await db.collection("study_plans").add({ "userId": user_id, **plan })
@@ -1,5 +1,5 @@
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 import os
 from dotenv import load_dotenv
 
@@ -25,5 +25,9 @@ if not firebase_admin._apps:
     except Exception as e:
         print(f"Error initializing Firebase Admin: {e}")
         
-#global db instance
-db = firestore.client()
+# Global async client: request handlers await every read/write so Firestore I/O
+# never blocks the event loop (documents, queries, batches, transactions).
+db = firestore_async.client()
+
+# Sync client for code that runs outside the event loop (maintenance scripts)
+sync_db = firestore.client()
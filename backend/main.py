@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -21,14 +22,29 @@ from routes.projects import router as projects_router
 from routes.resume import router as resume_router
 from routes.assignments import router as assignments_router
 from routes.jobs import router as jobs_router
+from utils.llm_pool import llm_pool
+from utils.llm_cache import llm_cache
+from utils.single_flight import llm_flights
+from utils.profile_cache import profile_cache
+from utils.timeline_logger import timeline_writer
+from agents.runs import close_run_store
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timeline_writer.start()
+    yield
+    # Flush queued timeline events before the worker exits
+    await timeline_writer.stop()
+    await close_run_store()
+
 app = FastAPI(
     title="LearnFlow AI Backend",
     description="Backend API for LearnFlow AI - College Learning Assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -78,5 +94,20 @@ def read_root():
 def health_check():
     return {"status": "healthy", "service": "LearnFlow-AI Backend"}
 
+@app.get("/health/llm")
+def llm_health():
+    """Per-key utilization of the LLM client pool, response cache and coalescing counters"""
+    return {"pool": llm_pool.stats(), "cache": llm_cache.stats(), "single_flight": llm_flights.stats()}
+
+@app.get("/health/cache")
+def cache_health():
+    """Hit rate of the in-process user profile cache"""
+    return {"profile": profile_cache.stats()}
+
+@app.get("/health/timeline")
+def timeline_health():
+    """Queue depth and write/drop counters of the background timeline writer"""
+    return timeline_writer.stats()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=False)
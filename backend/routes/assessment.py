@@ -1,14 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks
 from pydantic import BaseModel, Field
-from typing import List
-from utils.llm import llm
+from typing import Dict, List, Optional, Tuple
+from utils.llm_utils import ainvoke_with_retry
 from utils.route_utils import handle_error
 from firebase_admin import firestore
+from db.firebase import db
+from utils.profile_cache import profile_cache
+from utils.academic_summary import summary_ref, exam_delta
+import os
+import time
 import uuid
 from utils.timeline_logger import log_timeline_event
+from utils.question_bank import assemble_question_set, add_questions, mark_seen
 
 router = APIRouter(prefix="/assessment", tags=["assessment"])
-db = firestore.client()
 
 # Pydantic Models for Structured Output
 class MCQuestion(BaseModel):
@@ -17,6 +22,7 @@ class MCQuestion(BaseModel):
     options: List[str] = Field(description="Four answer options", min_items=4, max_items=4)
     correct_answer: int = Field(description="Index of correct option (0-3)", ge=0, le=3)
     topic_tag: str = Field(description="Specific topic this question tests")
+    difficulty: str = Field(default="medium", description="Difficulty level: easy, medium, or hard")
 
 class AssessmentQuestions(BaseModel):
     """Collection of assessment questions"""
@@ -27,6 +33,8 @@ class GenerateRequest(BaseModel):
     subject: str
     topics: List[str]
     set_number: int  # 1, 2, or 3
+    uid: Optional[str] = None  # Used to avoid repeating questions the user has seen
+    difficulty: Optional[str] = None  # easy, medium, hard; mixed when omitted
 
 class Question(BaseModel):
     id: str
@@ -43,19 +51,60 @@ class SubmitRequest(BaseModel):
     questions: List[Question]
 
 @router.post("/generate", response_model=List[Question])
-async def generate_assessment(request: GenerateRequest):
+async def generate_assessment(request: GenerateRequest, background_tasks: BackgroundTasks):
+    """Assemble 10 MCQ questions from the question bank, generating with the LLM only on a shortfall"""
+    topics = request.topics or [request.subject]
+    
+    try:
+        questions, low_stock = await assemble_question_set(
+            request.subject, topics, uid=request.uid, difficulty=request.difficulty
+        )
+    except Exception as e:
+        print(f"Question bank lookup failed: {str(e)}")
+        questions, low_stock = None, []
+    
+    low_stock = refill_due(request.subject, low_stock)
+    if low_stock:
+        background_tasks.add_task(refill_question_bank, request.subject, low_stock)
+    
+    if questions:
+        background_tasks.add_task(mark_seen, request.uid, request.subject, [q["id"] for q in questions])
+        return questions
+    
+    try:
+        assessment = await generate_questions(request.subject, topics)
+    except Exception as e:
+        # All attempts failed, use fallback
+        print(f"All attempts failed, using fallback questions: {str(e)}")
+        return create_fallback_questions(request.subject, topics)
+    
+    # Store in the bank so later requests can be served without the LLM
+    try:
+        questions = await add_questions(request.subject, topics, assessment.questions)
+        background_tasks.add_task(mark_seen, request.uid, request.subject, [q["id"] for q in questions])
+    except Exception as e:
+        print(f"Failed to store questions in bank: {str(e)}")
+        questions = [
+            {
+                "id": str(uuid.uuid4()),
+                "question": q.question,
+                "options": q.options,
+                "correct_answer": q.correct_answer,
+                "topic_tag": q.topic_tag
+            }
+            for q in assessment.questions
+        ]
+    
+    print(f"Successfully generated {len(questions)} complete questions")
+    return questions
+
+
+async def generate_questions(subject: str, topics: List[str]) -> AssessmentQuestions:
     """Generate 10 MCQ questions using structured output with retry logic"""
-    max_retries = 3
+    topics_str = ", ".join(topics)
     
-    for attempt in range(max_retries):
-        try:
-            # Create structured output LLM with include_raw for better error handling
-            structured_llm = llm.with_structured_output(AssessmentQuestions, include_raw=True)
-            
-            topics_str = ", ".join(request.topics)
-            
-            # More explicit prompt emphasizing completion
-            prompt = f"""Generate EXACTLY 10 complete Multiple Choice Questions for "{request.subject}".
+    # More explicit prompt emphasizing completion
+    prompt = f"""Generate EXACTLY 10 complete Multiple Choice Questions for "{subject}".
 
 Topics to cover: {topics_str}
 
@@ -66,66 +115,79 @@ CRITICAL REQUIREMENTS:
    - options: EXACTLY 4 answer choices
    - correct_answer: Index 0-3 of the correct option
    - topic_tag: Which topic this tests
+   - difficulty: easy, medium, or hard
 3. DO NOT truncate or leave any question incomplete
 4. Mix difficulty levels (easy, medium, hard)
 5. Test understanding, not just memorization
 
 IMPORTANT: Complete ALL 10 questions fully before finishing!"""
 
-            # Get structured output
-            result = structured_llm.invoke(prompt)
-            
-            # Extract the parsed object
-            if isinstance(result, dict) and 'parsed' in result:
-                assessment = result['parsed']
-            else:
-                assessment = result
-            
-            # Validate we got exactly 10 questions
-            if not hasattr(assessment, 'questions') or len(assessment.questions) != 10:
-                print(f"Attempt {attempt + 1}: Got {len(assessment.questions) if hasattr(assessment, 'questions') else 0} questions, retrying...")
-                continue
-            
-            # Validate each question is complete
-            all_complete = True
-            for i, q in enumerate(assessment.questions):
-                if not all([
-                    hasattr(q, 'question') and q.question,
-                    hasattr(q, 'options') and len(q.options) == 4,
-                    hasattr(q, 'correct_answer') and 0 <= q.correct_answer <= 3,
-                    hasattr(q, 'topic_tag') and q.topic_tag
-                ]):
-                    print(f"Attempt {attempt + 1}: Question {i+1} incomplete, retrying...")
-                    all_complete = False
-                    break
-            
-            if not all_complete:
-                continue
-            
-            # All questions are complete, format and return
-            questions = []
-            for q in assessment.questions:
-                questions.append({
-                    "id": str(uuid.uuid4()),
-                    "question": q.question,
-                    "options": q.options,
-                    "correct_answer": q.correct_answer,
-                    "topic_tag": q.topic_tag
-                })
-            
-            print(f"Successfully generated {len(questions)} complete questions on attempt {attempt + 1}")
-            return questions
+    return await ainvoke_with_retry(
+        AssessmentQuestions,
+        prompt,
+        max_retries=3,
+        validation_func=is_complete_assessment,
+        cache=False  # Every attempt should get a fresh question set
+    )
+
+
+# (subject, topic) pairs currently being refilled in this worker
+_refilling_topics = set()
+
+# A low-stock topic is refilled at most once per cooldown, not on every request until it is stocked
+REFILL_COOLDOWN_SECONDS = float(os.getenv("QUESTION_BANK_REFILL_COOLDOWN_SECONDS", "600"))
+_last_refill: Dict[Tuple[str, str], float] = {}
+
+
+def refill_due(subject: str, topics: List[str]) -> List[str]:
+    """The low-stock topics not refilled within the cooldown; marks them as refilled now"""
+    now = time.monotonic()
+    due = []
+    for topic in topics:
+        key = (subject.lower(), topic.lower())
+        if now - _last_refill.get(key, float("-inf")) >= REFILL_COOLDOWN_SECONDS:
+            _last_refill[key] = now
+            due.append(topic)
+    return due
+
+
+async def refill_question_bank(subject: str, topics: List[str]):
+    """Top up low-stock topics with freshly generated questions (runs as a background task)"""
+    for topic in topics:
+        key = (subject.lower(), topic.lower())
+        if key in _refilling_topics:
+            continue
         
+        _refilling_topics.add(key)
+        try:
+            assessment = await generate_questions(subject, [topic])
+            await add_questions(subject, [topic], assessment.questions)
+            print(f"Refilled question bank for {subject} / {topic}")
         except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {str(e)}")
-            if attempt == max_retries - 1:
-                # Last attempt failed, use fallback
-                print("All attempts failed, using fallback questions")
-                return create_fallback_questions(request.subject, request.topics)
-            continue
+            print(f"Question bank refill failed for {subject} / {topic}: {str(e)}")
+        finally:
+            _refilling_topics.discard(key)
+
+
+def is_complete_assessment(assessment: AssessmentQuestions) -> bool:
+    """Check that exactly 10 questions came back and every field is filled in"""
+    # Validate we got exactly 10 questions
+    if not hasattr(assessment, 'questions') or len(assessment.questions) != 10:
+        print(f"Got {len(assessment.questions) if hasattr(assessment, 'questions') else 0} questions")
+        return False
+    
+    # Validate each question is complete
+    for i, q in enumerate(assessment.questions):
+        if not all([
+            hasattr(q, 'question') and q.question,
+            hasattr(q, 'options') and len(q.options) == 4,
+            hasattr(q, 'correct_answer') and 0 <= q.correct_answer <= 3,
+            hasattr(q, 'topic_tag') and q.topic_tag
+        ]):
+            print(f"Question {i+1} incomplete")
+            return False
     
-    # If we somehow get here, return fallback
-    return create_fallback_questions(request.subject, request.topics)
+    return True
 
 
 @router.post("/submit")
@@ -150,21 +212,30 @@ async def submit_assessment(request: SubmitRequest):
         user_ref = db.collection("user_profiles").document(request.uid)
         exam_ref = user_ref.collection("exams").document(request.exam_id)
         
-        # Update exam readiness
-        exam_ref.update({
-            "readiness_score": accuracy,
-            "last_assessment_date": firestore.SERVER_TIMESTAMP
-        })
+        # Update exam readiness and the readiness sum by the change, in one transaction
+        # so concurrent submissions for the same exam can't both apply a delta from the same old score
+        @firestore.async_transactional
+        async def apply_readiness(transaction):
+            exam_doc = await exam_ref.get(transaction=transaction)
+            previous_readiness = exam_doc.to_dict().get('readiness_score', 0) if exam_doc.exists else 0
+            transaction.update(exam_ref, {
+                "readiness_score": accuracy,
+                "last_assessment_date": firestore.SERVER_TIMESTAMP
+            })
+            transaction.set(summary_ref(request.uid), exam_delta(readiness=accuracy - previous_readiness), merge=True)
+        
+        await apply_readiness(db.transaction())
         
         # Update weak areas
-        profile_doc = user_ref.get()
+        profile_doc = await user_ref.get()
         current_weak_areas = profile_doc.to_dict().get('weak_areas', []) if profile_doc.exists else []
         updated_weak_areas = (current_weak_areas + weak_topics)[-50:]  # Keep last 50
         
-        user_ref.update({"weak_areas": updated_weak_areas})
+        await user_ref.update({"weak_areas": updated_weak_areas})
+        profile_cache.invalidate(request.uid)
         
         # Log performance history
-        user_ref.collection("stats_history").add({
+        await user_ref.collection("stats_history").add({
             "date": firestore.SERVER_TIMESTAMP,
             "exam_subject": request.exam_id,
             "score": accuracy,
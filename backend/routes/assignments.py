@@ -1,15 +1,20 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from utils.llm import llm
+from utils.llm_utils import ainvoke_structured, ainvoke_with_retry
+from utils.text_chunker import chunk_pages
 from firebase_admin import firestore
+from db.firebase import db
+import asyncio
+import difflib
+import os
 import pypdf
 import io
+import re
 import uuid
 from datetime import datetime
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
-db = firestore.client()
 
 class TodoItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -25,36 +30,36 @@ class AssignmentResponse(BaseModel):
     todos: List[TodoItem] = Field(description="List of actionable todos")
     created_at: Optional[datetime] = None
 
-@router.post("/upload", response_model=AssignmentResponse)
-async def upload_assignment(
-    file: UploadFile = File(...),
-    uid: str = Form(...)
-):
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-    
-    try:
-        # Read file content
-        content = await file.read()
-        pdf_file = io.BytesIO(content)
-        
-        # Extract text using pypdf
-        reader = pypdf.PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-            
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
-            
-        # Truncate text if too long (to fit context window)
-        if len(text) > 20000:
-            text = text[:20000] + "...(truncated)"
-            
-        # Process with LLM
-        prompt = f"""
+class AssignmentOverview(BaseModel):
+    title: str = Field(description="Title of the whole assignment")
+    summary: str = Field(description="Brief summary of what the whole assignment entails")
+
+# Token budget per chunk; documents that fit in one chunk use a single call
+CHUNK_TOKENS = int(os.getenv("ASSIGNMENT_CHUNK_TOKENS", "5000"))
+CHUNK_CONCURRENCY = int(os.getenv("ASSIGNMENT_CHUNK_CONCURRENCY", "4"))
+
+# Todos whose normalized text is at least this similar are treated as duplicates
+TODO_SIMILARITY = 0.85
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def extract_pages(content: bytes) -> List[str]:
+    """Extract the text of every PDF page"""
+    reader = pypdf.PdfReader(io.BytesIO(content))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def build_todo_prompt(text: str, part: int = 1, total: int = 1) -> str:
+    scope = ""
+    if total > 1:
+        scope = f"""
+        This is part {part} of {total} of a longer assignment. Only create todos for the work
+        described in this part, and summarize just this part.
+        """
+    return f"""
         Analyze the following assignment text and break it down into a clear, actionable checklist of todos.
-        
+        {scope}
         ASSIGNMENT TEXT:
         {text}
         
@@ -71,9 +76,102 @@ async def upload_assignment(
             ]
         }}
         """
+
+
+def _todo_key(task: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", task.lower()).strip()
+
+
+def merge_todos(groups: List[List[TodoItem]]) -> List[TodoItem]:
+    """
+    Concatenate per-chunk todos in document order, dropping near-duplicates.
+    When two todos match, the one with the higher priority is kept in the earlier position.
+    """
+    merged: List[TodoItem] = []
+    keys: List[str] = []
+    for todos in groups:
+        for todo in todos:
+            key = _todo_key(todo.task)
+            match = next(
+                (i for i, existing in enumerate(keys)
+                 if existing == key or difflib.SequenceMatcher(None, existing, key).ratio() >= TODO_SIMILARITY),
+                None
+            )
+            if match is None:
+                merged.append(todo)
+                keys.append(key)
+            elif PRIORITY_RANK.get(todo.priority.lower(), 1) < PRIORITY_RANK.get(merged[match].priority.lower(), 1):
+                merged[match].priority = todo.priority
+    return merged
+
+
+async def extract_assignment(pages: List[str]) -> AssignmentResponse:
+    """
+    Build the todo checklist for a whole document with chunked map-reduce.
+    
+    Args:
+        pages: Extracted text per page
+    
+    Returns:
+        AssignmentResponse covering every chunk of the document
+    """
+    chunks = chunk_pages(pages, CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        return await ainvoke_structured(AssignmentResponse, build_todo_prompt("\n".join(chunks)))
+    
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    
+    async def extract_chunk(i: int, chunk: str) -> AssignmentResponse:
+        async with semaphore:
+            return await ainvoke_with_retry(
+                AssignmentResponse, build_todo_prompt(chunk, i + 1, len(chunks)), max_retries=2
+            )
+    
+    results = await asyncio.gather(*(extract_chunk(i, c) for i, c in enumerate(chunks)), return_exceptions=True)
+    parts = [r for r in results if not isinstance(r, Exception)]
+    for i, r in enumerate(results):
+        if isinstance(r, Exception):
+            print(f"Assignment chunk {i + 1}/{len(chunks)} failed: {r}")
+    if not parts:
+        raise results[0]
+    
+    # Reduce: one short call turns the per-part summaries into an overall title/summary
+    try:
+        part_summaries = "\n".join(f"- {p.title}: {p.summary}" for p in parts)
+        overview = await ainvoke_structured(AssignmentOverview, f"""
+        These are summaries of consecutive parts of one assignment:
+        {part_summaries}
+        
+        Give the whole assignment a title and a brief overall summary.
+        """)
+        title, summary = overview.title, overview.summary
+    except Exception as e:
+        print(f"Assignment overview failed, using first part: {e}")
+        title, summary = parts[0].title, parts[0].summary
+    
+    return AssignmentResponse(title=title, summary=summary, todos=merge_todos([p.todos for p in parts]))
+
+
+@router.post("/upload", response_model=AssignmentResponse)
+async def upload_assignment(
+    file: UploadFile = File(...),
+    uid: str = Form(...)
+):
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    
+    try:
+        # Read file content
+        content = await file.read()
+        
+        # Extract text using pypdf (CPU-bound, keep it off the event loop)
+        pages = await asyncio.to_thread(extract_pages, content)
+        
+        if not any(page.strip() for page in pages):
+            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
         
-        structured_llm = llm.with_structured_output(AssignmentResponse)
-        response = structured_llm.invoke(prompt)
+        # Process with LLM, chunking long documents instead of truncating them
+        response = await extract_assignment(pages)
         
         # Add metadata and IDs
         assignment_id = str(uuid.uuid4())
@@ -85,17 +183,19 @@ async def upload_assignment(
             if not getattr(todo, 'id', None):
                 todo.id = str(uuid.uuid4())
             todo.completed = False
-            
+        
         # Save to Firestore
         assignment_dict = response.model_dump()
         assignment_dict['created_at'] = datetime.now() # ensure datetime is preserved
         
         user_ref = db.collection('user_profiles').document(uid)
         assignment_ref = user_ref.collection('assignments').document(assignment_id)
-        assignment_ref.set(assignment_dict)
+        await assignment_ref.set(assignment_dict)
         
         return response
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error processing assignment: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process assignment: {str(e)}")
@@ -104,13 +204,13 @@ async def upload_assignment(
 async def get_assignments(uid: str):
     try:
         assignments_ref = db.collection('user_profiles').document(uid).collection('assignments')
-        docs = assignments_ref.order_by('created_at', direction=firestore.Query.DESCENDING).get()
+        docs = await assignments_ref.order_by('created_at', direction=firestore.Query.DESCENDING).get()
         
         assignments = []
         for doc in docs:
             data = doc.to_dict()
             assignments.append(AssignmentResponse(**data))
-            
+        
         return assignments
     except Exception as e:
         print(f"Error fetching assignments: {str(e)}")
@@ -125,11 +225,11 @@ async def update_todo_status(
 ):
     try:
         assignment_ref = db.collection('user_profiles').document(uid).collection('assignments').document(assignment_id)
-        doc = assignment_ref.get()
+        doc = await assignment_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Assignment not found")
-            
+        
         data = doc.to_dict()
         updated = False
         
@@ -139,13 +239,13 @@ async def update_todo_status(
                 todo['completed'] = completed
                 updated = True
                 break
-                
+        
         if not updated:
             raise HTTPException(status_code=404, detail="Todo item not found")
-            
-        assignment_ref.update({'todos': data['todos']})
-        return {"status": "success", "message": "Todo updated"}
         
+        await assignment_ref.update({'todos': data['todos']})
+        return {"status": "success", "message": "Todo updated"}
+    
     except HTTPException:
         raise
     except Exception as e:
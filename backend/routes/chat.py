@@ -7,10 +7,13 @@ from langgraph.prebuilt import create_react_agent
 from utils.llm import llm
 from firebase_admin import firestore
 from datetime import datetime
+from db.firebase import db
+from utils.profile_cache import profile_cache
+from utils.academic_summary import summary_ref, exam_delta
+from utils.syllabus import SYLLABUS_SCHEMA_VERSION, syllabus_to_map
 from routes.planner import PlannerSettings, generate_plan, get_latest_plan # Reuse existing logic
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-db = firestore.client()
 
 class ChatRequest(BaseModel):
     message: str
@@ -27,7 +30,7 @@ async def get_my_schedule(uid: str) -> str:
         # We can reuse the logic from planner route, but need to handle async
         # For simplicity, let's just query the DB directly here similar to the route
         plans_ref = db.collection("user_profiles").document(uid).collection("generated_plans")
-        docs = plans_ref.order_by("created_at", direction=firestore.Query.DESCENDING).limit(1).get()
+        docs = await plans_ref.order_by("created_at", direction=firestore.Query.DESCENDING).limit(1).get()
         
         if not docs:
             return "No schedule found. You haven't generated one yet."
@@ -90,7 +93,7 @@ async def add_deadline(uid: str, title: str, date: str, subject: str = "General"
             "completed": False,
             "created_at": datetime.utcnow().isoformat()
         }
-        db.collection("user_profiles").document(uid).collection("deadlines").add(deadline_data)
+        await db.collection("user_profiles").document(uid).collection("deadlines").add(deadline_data)
         return f"Added deadline: '{title}' for {subject} on {date}."
     except Exception as e:
         return f"Error adding deadline: {str(e)}"
@@ -120,7 +123,15 @@ async def add_exam(uid: str, title: str, date: str, subject: str = "General", to
         }
         
         # Add to 'exams' collection
-        doc_ref = db.collection("user_profiles").document(uid).collection("exams").add(exam_data)
+        doc_ref = db.collection("user_profiles").document(uid).collection("exams").document()
+        batch = db.batch()
+        batch.set(doc_ref, {
+            **exam_data,
+            "syllabus": syllabus_to_map(syllabus_list),
+            "schema_version": SYLLABUS_SCHEMA_VERSION
+        })
+        batch.set(summary_ref(uid), exam_delta(exams=1), merge=True)
+        await batch.commit()
         return f"Added exam: '{title}' for {subject} on {date} with {len(syllabus_list)} topics."
     except Exception as e:
         return f"Error adding exam: {str(e)}"
@@ -133,7 +144,7 @@ async def get_upcoming_deadlines(uid: str) -> str:
         docs = deadlines_ref.where("completed", "==", False).stream()
         
         deadlines = []
-        for doc in docs:
+        async for doc in docs:
             d = doc.to_dict()
             deadlines.append(f"- {d.get('due_date')}: {d.get('title')} ({d.get('subject')})")
             
@@ -178,10 +189,9 @@ async def chat_message(request: ChatRequest):
         now = datetime.now().isoformat()
         
         # Fetch user profile to get valid subjects
-        user_ref = db.collection("user_profiles").document(request.uid).get()
+        user_data = await profile_cache.get(request.uid)
         subjects_list = "General" # Default
-        if user_ref.exists:
-            user_data = user_ref.to_dict()
+        if user_data:
             subjects = user_data.get("academic_subjects", [])
             if subjects:
                 subjects_list = ", ".join(subjects)
@@ -1,10 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, timedelta
-from agents.schemas import ExamInfo, StudyPlan
-from agents.college.exam_parser import parse_exam_info
-from agents.college.planner_agent import create_study_plan
+from agents.graph import college_graph
+from agents.runs import new_run_id, claim_run, execute_run, get_run
 from utils.route_utils import handle_error
 
 router = APIRouter(prefix="/study", tags=["study-planner"])
@@ -13,45 +12,40 @@ router = APIRouter(prefix="/study", tags=["study-planner"])
 class StudyPlanRequest(BaseModel):
     user_id: str
     input_text: str
+    include_history: bool = False
 
 class StudyPlanResponse(BaseModel):
     exam: Optional[dict]
     days_left: Optional[int]
     urgency: Optional[str]
     plan: Optional[dict]
+    # One of cram_mode, intensify or normal (strategy_agent), as the fallback plan already returned
     strategy: Optional[str]
+    progress_history: Optional[List[dict]] = None
     message: str
 
 @router.post("/create-plan", response_model=StudyPlanResponse)
 async def create_study_plan_route(request: StudyPlanRequest):
     """
-    Create a personalized study plan using AI agents with structured output
+    Create a personalized study plan by running the college agent graph end to end
+    
+    The exam is parsed while the user's academic context and progress are read,
+    then the plan and strategy are produced from the joined state.
     """
     try:
-        # Step 1: Parse exam info using structured output agent
-        exam_info: ExamInfo = parse_exam_info(request.input_text)
-        
-        # Step 2: Create study plan using structured output agent
-        study_plan: StudyPlan = create_study_plan(exam_info)
+        state = await college_graph.ainvoke({
+            "user_id": request.user_id,
+            "input": request.input_text,
+            "include_history": request.include_history
+        })
         
-        # Step 3: Format response
         return StudyPlanResponse(
-            exam={
-                "subject": exam_info.subject,
-                "exam_date": exam_info.exam_date,
-                "topics": exam_info.topics
-            },
-            days_left=exam_info.days_until_exam,
-            urgency=exam_info.urgency,
-            plan={
-                "daily_plan": [
-                    {"day": day.day_number, "tasks": day.tasks}
-                    for day in study_plan.daily_breakdown
-                ],
-                "total_hours": study_plan.total_study_hours,
-                "priority_topics": study_plan.priority_topics
-            },
-            strategy=study_plan.strategy,
+            exam=state.get("exam"),
+            days_left=state.get("days_left"),
+            urgency=state.get("urgency"),
+            plan=state.get("plan"),
+            strategy=state.get("strategy"),
+            progress_history=state.get("progress_history"),
             message="Study plan created successfully using AI agents"
         )
     
@@ -61,6 +55,61 @@ async def create_study_plan_route(request: StudyPlanRequest):
         return create_fallback_plan(request.input_text)
 
 
+@router.post("/runs")
+async def start_plan_run(request: StudyPlanRequest, background_tasks: BackgroundTasks):
+    """
+    Start a checkpointed study plan run in the background
+    
+    Poll ``GET /study/runs/{run_id}`` for its state. A failed or interrupted
+    run can be resumed with ``POST /study/runs/{run_id}/resume``.
+    """
+    try:
+        run_id = new_run_id()
+        await claim_run(run_id)
+        background_tasks.add_task(execute_run, run_id, {
+            "user_id": request.user_id,
+            "input": request.input_text,
+            "include_history": request.include_history
+        })
+        return {"run_id": run_id, "status": "running"}
+    except Exception as e:
+        raise handle_error(e, "Plan Run")
+
+
+@router.get("/runs/{run_id}")
+async def get_plan_run(run_id: str):
+    """Get the status, pending steps and current state of a study plan run"""
+    try:
+        run = await get_run(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return run
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise handle_error(e, "Plan Run")
+
+
+@router.post("/runs/{run_id}/resume")
+async def resume_plan_run(run_id: str, background_tasks: BackgroundTasks):
+    """Resume a failed or interrupted run from its last completed step"""
+    try:
+        run = await get_run(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        if run["status"] == "completed":
+            return run
+        if not await claim_run(run_id):
+            raise HTTPException(status_code=409, detail="Run is already in progress")
+        
+        background_tasks.add_task(execute_run, run_id)
+        return {"run_id": run_id, "status": "running", "next": run["next"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise handle_error(e, "Plan Run")
+
+
 @router.get("/health")
 async def health_check():
     """Check if the study planner service is running"""
@@ -2,9 +2,13 @@ from fastapi import APIRouter, HTTPException
 from firebase_admin import firestore
 from datetime import datetime, timedelta
 from typing import List, Dict
+from db.firebase import db
+from utils.profile_cache import profile_cache
+from utils.sidehustle_summary import get_summary, rebuild_summary
+from utils.route_utils import get_documents
+from utils.activity_counter import get_daily_activity
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
-db = firestore.client()
 
 @router.get("/sidehustle/{uid}")
 async def get_sidehustle_dashboard(uid: str):
@@ -13,29 +17,26 @@ async def get_sidehustle_dashboard(uid: str):
     """
     try:
         user_ref = db.collection("user_profiles").document(uid)
-        profile_doc = user_ref.get()
+        profile_data = await profile_cache.get(uid)
         
-        if not profile_doc.exists:
+        if profile_data is None:
             raise HTTPException(status_code=404, detail="User not found")
         
-        profile_data = profile_doc.to_dict()
+        # Skill and project aggregates come from the materialized summary document
+        summary = await get_summary(uid)
+        if summary is None:
+            # First visit (or old layout): backfill from the subcollections once
+            summary = await rebuild_summary(uid)
+        all_skills = list(summary.get('skills', {}).values())
         
-        # Get skills data
-        skills_ref = user_ref.collection("skills")
-        all_skills = [doc.to_dict() for doc in skills_ref.stream()]
-        
-        # Get projects data
-        projects_ref = user_ref.collection("projects")
-        all_projects = [doc.to_dict() for doc in projects_ref.stream()]
-        
-        # Get learning sources
-        sources_ref = user_ref.collection("learning_sources")
-        all_sources = [doc.to_dict() for doc in sources_ref.stream()]
+        # Get learning sources (only the top 5 are shown)
+        sources_ref = user_ref.collection("learning_sources").limit(5)
+        all_sources = [doc.to_dict() async for doc in sources_ref.stream()]
         
         # Get activity alerts
         alerts_ref = user_ref.collection("activity_alerts").order_by("created_at", direction=firestore.Query.DESCENDING).limit(5)
         all_alerts = []
-        for doc in alerts_ref.stream():
+        async for doc in alerts_ref.stream():
             alert_data = doc.to_dict()
             alert_data['id'] = doc.id
             all_alerts.append(alert_data)
@@ -47,15 +48,15 @@ async def get_sidehustle_dashboard(uid: str):
             skills_in_progress = len(profile_data.get('side_hustle_interests', []))
         else:
             skills_in_progress = 0
-        projects_completed = len([p for p in all_projects if p.get('status') == 'completed'])
+        projects_completed = summary.get('projects_completed', 0)
         
         # Calculate weekly practice hours
         week_ago = datetime.now() - timedelta(days=7)
         practice_sessions = user_ref.collection("practice_sessions").where("date", ">=", week_ago).stream()
-        weekly_hours = sum(session.to_dict().get('duration', 0) for session in practice_sessions) / 60  # Convert to hours
+        weekly_hours = sum([session.to_dict().get('duration', 0) async for session in practice_sessions]) / 60  # Convert to hours
         
         # Calculate portfolio readiness
-        total_portfolio_items = sum(1 for p in all_projects if p.get('in_portfolio', False))
+        total_portfolio_items = summary.get('portfolio_items', 0)
         portfolio_target = 10  # Target number of portfolio items
         portfolio_ready = min(int((total_portfolio_items / portfolio_target) * 100), 100)
         
@@ -87,60 +88,42 @@ async def get_sidehustle_dashboard(uid: str):
                     return icon
             return 'Code' # Default
         
-        if all_skills:
-            for skill in all_skills:
-                # Try to get roadmap for detailed progress even if skill doc exists
-                progress = int(skill.get('mastery', 0))
-                try:
-                    roadmap_doc = user_ref.collection("roadmaps").document(skill.get('name', '').lower()).get()
-                    if roadmap_doc.exists:
-                        r_data = roadmap_doc.to_dict()
-                        total = 0
-                        completed = 0
-                        for phase in r_data.get('phases', []):
-                            items = phase.get('items', [])
-                            total += len(items)
-                            completed += sum(1 for i in items if i.get('completed'))
-                        if total > 0:
-                            progress = int((completed / total) * 100)
-                except:
-                    pass
-
-                skill_progress.append({
-                    'name': skill.get('name', 'Skill'),
-                    'progress': progress,
-                    'icon': get_icon(skill.get('name', ''))
-                })
+        def roadmap_progress(r_data, default):
+            total = 0
+            completed = 0
+            for phase in r_data.get('phases', []):
+                items = phase.get('items', [])
+                total += len(items)
+                completed += sum(1 for i in items if i.get('completed'))
+            return int((completed / total) * 100) if total > 0 else default
         
-        # Merge with profile interests that aren't already covered by skills
-        existing_skill_names = set(s.get('name', '').lower() for s in skill_progress)
+        # Skills first, then profile interests that aren't already covered by skills
+        tracked = [(skill.get('name', 'Skill'), skill.get('name', ''), int(skill.get('mastery', 0))) for skill in all_skills]
+        existing_skill_names = set(s.get('name', '').lower() for s in all_skills)
+        for interest in profile_data.get('side_hustle_interests') or []:
+            if interest.lower() not in existing_skill_names:
+                tracked.append((interest, interest, 0))
         
-        if profile_data.get('side_hustle_interests'):
-            for interest in profile_data.get('side_hustle_interests', []):
-                if interest.lower() in existing_skill_names:
-                    continue
-                    
-                progress = 0
-                try:
-                    roadmap_doc = user_ref.collection("roadmaps").document(interest.lower()).get()
-                    if roadmap_doc.exists:
-                        r_data = roadmap_doc.to_dict()
-                        total = 0
-                        completed = 0
-                        for phase in r_data.get('phases', []):
-                            items = phase.get('items', [])
-                            total += len(items)
-                            completed += sum(1 for i in items if i.get('completed'))
-                        if total > 0:
-                            progress = int((completed / total) * 100)
-                except:
-                    pass
-
-                skill_progress.append({
-                    'name': interest,
-                    'progress': progress,
-                    'icon': get_icon(interest)
-                })
+        # Fetch every roadmap in one batched read instead of one .get() per skill
+        roadmaps_ref = user_ref.collection("roadmaps")
+        roadmap_refs = {name: roadmaps_ref.document(name.lower()) for _, name, _ in tracked if name and "/" not in name}
+        try:
+            roadmaps = await get_documents(list(roadmap_refs.values()))
+        except Exception as e:
+            print(f"Failed to fetch roadmaps: {e}")
+            roadmaps = {}
+        
+        for label, name, default_progress in tracked:
+            progress = default_progress
+            ref = roadmap_refs.get(name)
+            if ref is not None and ref.path in roadmaps:
+                progress = roadmap_progress(roadmaps[ref.path], default_progress)
+            
+            skill_progress.append({
+                'name': label,
+                'progress': progress,
+                'icon': get_icon(name)
+            })
         
         # Format learning sources
         learning_sources = []
@@ -155,7 +138,11 @@ async def get_sidehustle_dashboard(uid: str):
         
         # Format assigned projects
         assigned_projects = []
-        active_projects = [p for p in all_projects if p.get('status') == 'assigned']
+        active_projects = sorted(
+            summary.get('active_projects', {}).values(),
+            key=lambda p: p.get('created_at') or '',
+            reverse=True
+        )
         
         for project in active_projects[:5]:  # Top 5 active projects
             assigned_projects.append({
@@ -178,20 +165,8 @@ async def get_sidehustle_dashboard(uid: str):
                 'time': format_time_ago(alert.get('created_at'))
             })
         
-        # Calculate daily activity for heatmap (last 365 days)
-        year_ago = datetime.now() - timedelta(days=365)
-        activity_ref = user_ref.collection("activity_alerts").where("created_at", ">=", year_ago.isoformat()).stream()
-        
-        date_counts = {}
-        for doc in activity_ref:
-            data = doc.to_dict()
-            date_str = data.get('created_at', '')[:10] # YYYY-MM-DD
-            if date_str:
-                date_counts[date_str] = date_counts.get(date_str, 0) + 1
-        
-        daily_activity = []
-        for date, count in date_counts.items():
-            daily_activity.append({"date": date, "count": count})
+        # Daily activity for heatmap (last 365 days) from the per-year counter documents
+        daily_activity = await get_daily_activity(uid)
             
         return {
             "stats": {
@@ -206,7 +181,7 @@ async def get_sidehustle_dashboard(uid: str):
             "assigned_projects": assigned_projects,
             "activity_alerts": activity_alerts,
             "daily_activity": daily_activity,
-            "monthly_project_stats": get_monthly_project_stats(all_projects)
+            "monthly_project_stats": get_monthly_project_stats(summary.get('monthly_completions', {}))
         }
     
     except Exception as e:
@@ -224,7 +199,7 @@ async def get_deadlines(uid: str):
         deadlines_ref = user_ref.collection("deadlines").where("dueDate", ">=", datetime.now()).order_by("dueDate").limit(10)
         
         deadlines = []
-        for doc in deadlines_ref.stream():
+        async for doc in deadlines_ref.stream():
             data = doc.to_dict()
             deadlines.append({
                 "id": doc.id,
@@ -251,7 +226,7 @@ async def get_reminders(uid: str):
         reminders_ref = user_ref.collection("reminders").where("completed", "==", False).order_by("dueTime").limit(10)
         
         reminders = []
-        for doc in reminders_ref.stream():
+        async for doc in reminders_ref.stream():
             data = doc.to_dict()
             reminders.append({
                 "id": doc.id,
@@ -269,50 +244,20 @@ async def get_reminders(uid: str):
         return {"reminders": []}
 
 
-def get_monthly_project_stats(all_projects: List[Dict]) -> List[Dict]:
+def get_monthly_project_stats(monthly_completions: Dict[str, int]) -> List[Dict]:
     """
-    Calculate monthly project completions for the last 6 months.
-    Returns list of {name: 'Month', value: count}
+    Monthly project completions for the last 6 months.
+    Takes the summary's {'YYYY-MM': count} map and returns list of {name: 'Month', value: count}
     """
-    # Initialize last 6 months with 0
     today = datetime.now()
-    stats = {}
-    for i in range(5, -1, -1):
-        d = today - timedelta(days=i*30) # Approx month
-        month_name = d.strftime("%b")
-        stats[month_name] = 0
-        
-    # Count completed projects
-    for project in all_projects:
-        if project.get('status') == 'completed' and project.get('completed_at'):
-            try:
-                # Parse date
-                completed_at = project.get('completed_at')
-                if isinstance(completed_at, str):
-                    dt = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
-                elif isinstance(completed_at, datetime):
-                    dt = completed_at
-                else:
-                    continue
-                
-                # Check if within last 6 months window (approx)
-                if (today - dt).days < 180:
-                    month_name = dt.strftime("%b")
-                    if month_name in stats:
-                        stats[month_name] += 1
-            except:
-                continue
-
-    # Convert to list ensuring order
     result = []
-    # Re-generate key order to ensure chronological sort
     for i in range(5, -1, -1):
-        d = today - timedelta(days=i*30)
+        d = today - timedelta(days=i*30) # Approx month
         month_name = d.strftime("%b")
-        # specific check to avoid duplicates if month names overlap in short window (unlikely with 30 days but safer)
-        if not any(x['name'] == month_name for x in result): 
-             result.append({"name": month_name, "value": stats.get(month_name, 0)})
-             
+        # specific check to avoid duplicates if month names overlap in short window
+        if not any(x['name'] == month_name for x in result):
+            result.append({"name": month_name, "value": monthly_completions.get(d.strftime("%Y-%m"), 0)})
+    
     return result
 
 
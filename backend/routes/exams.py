@@ -1,7 +1,12 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
+from firebase_admin import firestore
 from db.firebase import db
+from utils.syllabus import SYLLABUS_SCHEMA_VERSION, is_current, topic_key, topics_in_order, syllabus_to_map, syllabus_to_list
+from utils.academic_summary import summary_ref, exam_completion, exam_delta
+from utils.route_utils import get_user_subjects
+from agents.college.exam_parser import parse_exam_batch
 from datetime import datetime
 import uuid
 
@@ -32,56 +37,136 @@ async def create_exam(exam: Exam):
         exam_data['total_topics'] = len(exam.syllabus)
         exam_data['completed_topics'] = sum(1 for item in exam.syllabus if item.completed)
         
-        # Save to subcollection
-        doc_ref = db.collection("user_profiles").document(exam.uid).collection("exams").add(exam_data)
-        doc_id = doc_ref[1].id
+        # Save to subcollection (syllabus as a keyed map), together with the academic aggregates
+        doc_ref = db.collection("user_profiles").document(exam.uid).collection("exams").document()
+        batch = db.batch()
+        batch.set(doc_ref, {
+            **exam_data,
+            'syllabus': syllabus_to_map(exam_data['syllabus']),
+            'schema_version': SYLLABUS_SCHEMA_VERSION
+        })
+        batch.set(summary_ref(exam.uid), exam_delta(exams=1, completion=exam_completion(exam_data)), merge=True)
+        await batch.commit()
+        doc_id = doc_ref.id
         
         return {**exam_data, "id": doc_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class ParseBatchRequest(BaseModel):
+    uid: str
+    text: str
+
+# One write per exam plus the academic summary must fit in a single Firestore batch (500 writes)
+MAX_BATCH_EXAMS = 200
+
+@router.post("/parse-batch", response_model=List[ExamResponse])
+async def parse_batch(request: ParseBatchRequest):
+    """
+    Parse a pasted timetable or several announcements and create every exam in it
+    
+    All exams are written with one batch commit.
+    """
+    try:
+        parsed = await parse_exam_batch(request.text, await get_user_subjects(request.uid, default=[]))
+        if len(parsed) > MAX_BATCH_EXAMS:
+            raise HTTPException(status_code=400, detail=f"Found {len(parsed)} exams; at most {MAX_BATCH_EXAMS} can be added at once")
+        
+        created_at = datetime.utcnow().isoformat()
+        exams_ref = db.collection("user_profiles").document(request.uid).collection("exams")
+        batch = db.batch()
+        created = []
+        for info in parsed:
+            syllabus = [{"name": topic, "completed": False} for topic in info.topics]
+            exam_data = {
+                "uid": request.uid,
+                "subject": info.subject,
+                "title": f"{info.subject} Exam",
+                "date": info.exam_date,
+                "syllabus": syllabus,
+                "total_topics": len(syllabus),
+                "completed_topics": 0,
+                "created_at": created_at
+            }
+            doc_ref = exams_ref.document()
+            batch.set(doc_ref, {
+                **exam_data,
+                "syllabus": syllabus_to_map(syllabus),
+                "schema_version": SYLLABUS_SCHEMA_VERSION
+            })
+            created.append({**exam_data, "id": doc_ref.id})
+        
+        if created:
+            batch.set(summary_ref(request.uid), exam_delta(exams=len(created)), merge=True)
+            await batch.commit()
+        
+        return created
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 class ToggleTopicRequest(BaseModel):
     topic_index: int
     completed: bool
 
 @router.patch("/{uid}/{exam_id}/toggle", response_model=ExamResponse)
 async def toggle_topic(uid: str, exam_id: str, request: ToggleTopicRequest):
+    """
+    Mark one syllabus topic as completed or not.
+    
+    Runs in a transaction that updates only ``syllabus.<key>.completed`` and
+    increments ``completed_topics``, so concurrent toggles on the same exam
+    can't overwrite each other. Legacy list syllabi are converted to the keyed
+    map on their first toggle.
+    """
     try:
         doc_ref = db.collection("user_profiles").document(uid).collection("exams").document(exam_id)
-        doc = doc_ref.get()
         
-        if not doc.exists:
-            raise HTTPException(status_code=404, detail="Exam not found")
+        @firestore.async_transactional
+        async def apply_toggle(transaction):
+            doc = await doc_ref.get(transaction=transaction)
+            if not doc.exists:
+                raise HTTPException(status_code=404, detail="Exam not found")
             
-        data = doc.to_dict()
-        syllabus = data.get('syllabus', [])
-        
-        # Check if syllabus needs migration (contains strings)
-        migrated = False
-        if syllabus and isinstance(syllabus[0], str):
-            syllabus = [{"name": item, "completed": False} for item in syllabus]
-            migrated = True
-
-        if 0 <= request.topic_index < len(syllabus):
-             syllabus[request.topic_index]['completed'] = request.completed
-             
-             # Recalculate totals
-             total = len(syllabus)
-             completed = sum(1 for item in syllabus if item['completed'])
-             
-             update_data = {
-                 'syllabus': syllabus, # Save the migrated/updated structure
-                 'total_topics': total,
-                 'completed_topics': completed
-             }
-             
-             doc_ref.update(update_data)
-             
-             # Return updated exam
-             return {**data, **update_data, "id": doc.id}
-        else:
-             raise HTTPException(status_code=400, detail="Invalid topic index")
-
+            data = doc.to_dict()
+            legacy = not is_current(data)
+            syllabus = syllabus_to_map(data.get('syllabus') or []) if legacy else data.get('syllabus') or {}
+            
+            key = topic_key(request.topic_index)
+            if request.topic_index < 0 or key not in syllabus:
+                raise HTTPException(status_code=400, detail="Invalid topic index")
+            
+            before = exam_completion(data)
+            delta = int(request.completed) - int(syllabus[key]['completed'])
+            syllabus[key]['completed'] = request.completed
+            data['total_topics'] = len(syllabus)
+            
+            if legacy:
+                # First toggle on a list syllabus: store it as the keyed map
+                data['completed_topics'] = sum(1 for item in syllabus.values() if item['completed'])
+                transaction.update(doc_ref, {
+                    'syllabus': syllabus,
+                    'total_topics': data['total_topics'],
+                    'completed_topics': data['completed_topics'],
+                    'schema_version': SYLLABUS_SCHEMA_VERSION
+                })
+            elif delta:
+                data['completed_topics'] = data.get('completed_topics', 0) + delta
+                transaction.update(doc_ref, {
+                    f'syllabus.{key}.completed': request.completed,
+                    'completed_topics': firestore.Increment(delta)
+                })
+            
+            completion_change = exam_completion(data) - before
+            if completion_change:
+                transaction.set(summary_ref(uid), exam_delta(completion=completion_change), merge=True)
+            
+            # Return updated exam (counters follow from the transaction's read)
+            return {**data, 'syllabus': topics_in_order(syllabus), "id": doc.id}
+        
+        return await apply_toggle(db.transaction())
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -96,18 +181,14 @@ async def list_exams(uid: str, category: Optional[str] = None):
         
         all_items = []
         
-        for doc in exams_docs:
+        async for doc in exams_docs:
             data = doc.to_dict()
-            # Handle legacy syllabus format (list of strings)
-            if 'syllabus' in data and isinstance(data['syllabus'], list):
-                new_syllabus = []
-                for item in data['syllabus']:
-                    if isinstance(item, str):
-                        new_syllabus.append({"name": item, "completed": False})
-                    else:
-                        new_syllabus.append(item)
-                data['syllabus'] = new_syllabus
-
+            # Keyed-map syllabus to the list the frontend expects (unmigrated exams need the legacy conversion)
+            if is_current(data):
+                data['syllabus'] = topics_in_order(data.get('syllabus') or {})
+            elif 'syllabus' in data:
+                data['syllabus'] = syllabus_to_list(data['syllabus'])
+            
             all_items.append({
                 **data, 
                 "id": doc.id,
@@ -115,13 +196,13 @@ async def list_exams(uid: str, category: Optional[str] = None):
                 # ensure date field exists for sorting
                 "date": data.get("date", "") 
             })
-            
+        
         # 2. Fetch General Deadlines (from chat/assistant)
         deadlines_ref = db.collection("user_profiles").document(uid).collection("deadlines")
         # Filter partially if needed, but for now get all active ones
         deadlines_docs = deadlines_ref.where("completed", "==", False).stream()
         
-        for doc in deadlines_docs:
+        async for doc in deadlines_docs:
             data = doc.to_dict()
             # Map deadline fields to match exam fields where possible
             # 'due_date' -> 'date'
@@ -138,12 +219,12 @@ async def list_exams(uid: str, category: Optional[str] = None):
                 "completed_topics": 0,
                 "created_at": data.get("created_at", "")
             })
-
-            
+        
+        
         # Filter by category if requested
         if category:
             all_items = [item for item in all_items if item["category"] == category]
-
+        
         # Sort by date
         all_items.sort(key=lambda x: x.get('date', ''))
         
@@ -155,7 +236,24 @@ async def list_exams(uid: str, category: Optional[str] = None):
 @router.delete("/{uid}/{exam_id}")
 async def delete_exam(uid: str, exam_id: str):
     try:
-        db.collection("user_profiles").document(uid).collection("exams").document(exam_id).delete()
+        doc_ref = db.collection("user_profiles").document(uid).collection("exams").document(exam_id)
+        
+        # Read, delete and decrement together: a repeated or concurrent delete finds no
+        # document and leaves the academic summary alone
+        @firestore.async_transactional
+        async def apply_delete(transaction):
+            doc = await doc_ref.get(transaction=transaction)
+            if not doc.exists:
+                return
+            data = doc.to_dict()
+            transaction.delete(doc_ref)
+            transaction.set(summary_ref(uid), exam_delta(
+                exams=-1,
+                readiness=-data.get('readiness_score', 0),
+                completion=-exam_completion(data)
+            ), merge=True)
+        
+        await apply_delete(db.transaction())
         return {"message": "Exam deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
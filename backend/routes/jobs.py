@@ -2,8 +2,10 @@ from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
 from typing import List, Optional
 from db.firebase import db
+from utils.profile_cache import profile_cache
+from utils.sidehustle_summary import record_skill
 from datetime import datetime
-from utils.llm import llm
+from utils.llm_utils import ainvoke_text
 from firebase_admin import firestore
 import json
 from utils.timeline_logger import log_timeline_event
@@ -47,7 +49,7 @@ async def get_jobs(uid: str):
         suggestions_ref = user_ref.collection('job_suggestions')
         # Assuming latest suggestion set or just list all? For simplicity let's stick to a single list stored in a main doc or subcollection documents
         # Storing as a single document 'latest' in subcollection 'job_suggestions' for easy overwrite/retrieval
-        suggestion_doc = suggestions_ref.document('latest').get()
+        suggestion_doc = await suggestions_ref.document('latest').get()
         
         if suggestion_doc.exists:
             data = suggestion_doc.to_dict()
@@ -67,17 +69,16 @@ async def analyze_jobs(request: JobAnalysisRequest):
     try:
         # Get user profile
         user_ref = db.collection('user_profiles').document(request.uid)
-        profile_doc = user_ref.get()
+        profile_data = await profile_cache.get(request.uid)
         
-        if not profile_doc.exists:
+        if profile_data is None:
             raise HTTPException(status_code=404, detail="Profile not found")
             
-        profile_data = profile_doc.to_dict()
         interests = profile_data.get('side_hustle_interests', [])
         
         # Get current skills
         skills_ref = user_ref.collection('skills')
-        skills = [doc.to_dict().get('name') for doc in skills_ref.stream()]
+        skills = [doc.to_dict().get('name') async for doc in skills_ref.stream()]
         
         if not interests and not skills:
              return []
@@ -109,7 +110,7 @@ async def analyze_jobs(request: JobAnalysisRequest):
         """
         
         try:
-            response = llm.invoke(prompt).content
+            response = await ainvoke_text(prompt)
             
             # Clean response if markdown
             if "```json" in response:
@@ -121,7 +122,7 @@ async def analyze_jobs(request: JobAnalysisRequest):
             
             # Save to Firestore
             suggestions_ref = user_ref.collection('job_suggestions')
-            suggestions_ref.document('latest').set({
+            await suggestions_ref.document('latest').set({
                 "jobs": jobs_data,
                 "updated_at": datetime.utcnow().isoformat()
             })
@@ -158,7 +159,7 @@ async def analyze_gap(request: GapAnalysisRequest):
     try:
         user_ref = db.collection('user_profiles').document(request.uid)
         skills_ref = user_ref.collection('skills')
-        current_skills = [doc.to_dict().get('name') for doc in skills_ref.stream()]
+        current_skills = [doc.to_dict().get('name') async for doc in skills_ref.stream()]
         
         prompt = f"""
         Target Role: {request.role}
@@ -181,7 +182,7 @@ async def analyze_gap(request: GapAnalysisRequest):
         """
         
         try:
-            response = llm.invoke(prompt).content
+            response = await ainvoke_text(prompt)
             
             if "```json" in response:
                 response = response.split("```json")[1].split("```")[0]
@@ -219,7 +220,7 @@ async def add_skill(request: AddSkillRequest):
         
         # Check if skill already exists
         skills_ref = user_ref.collection('skills')
-        existing = skills_ref.where('name', '==', request.skill_name).get()
+        existing = await skills_ref.where('name', '==', request.skill_name).get()
         
         if len(existing) > 0:
             return {"message": "Skill already exists"}
@@ -232,7 +233,8 @@ async def add_skill(request: AddSkillRequest):
             "created_at": datetime.utcnow().isoformat()
         }
         
-        skills_ref.add(new_skill)
+        await skills_ref.add(new_skill)
+        await record_skill(request.uid, request.skill_name, new_skill["status"], new_skill["mastery"])
         
         # Log to Timeline
         await log_timeline_event(
@@ -247,9 +249,10 @@ async def add_skill(request: AddSkillRequest):
         
         # Sync with Profile Interests
         try:
-            user_ref.update({
+            await user_ref.update({
                 "side_hustle_interests": firestore.ArrayUnion([request.skill_name])
             })
+            profile_cache.invalidate(request.uid)
         except Exception as e:
             print(f"Failed to sync interest: {e}")
 
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from utils.llm import llm
+from utils.llm_utils import ainvoke_structured
 from utils.route_utils import handle_error
 from youtube_search import YoutubeSearch
 
@@ -30,9 +30,6 @@ class VideoResource(BaseModel):
 async def recommend_resources(request: RecommendationRequest):
     """Recommend YouTube learning resources using AI-optimized search"""
     try:
-        # Create structured output LLM
-        structured_llm = llm.with_structured_output(SearchQuery)
-        
         # Concise prompt
         prompt = f"""Generate ONE optimized YouTube search query for learning about "{request.topic}" in {request.subject}.
 
@@ -47,7 +44,7 @@ Example: For "Photosynthesis" in Biology, return: "photosynthesis explained anim
 
         try:
             # Get optimized query
-            search_query: SearchQuery = structured_llm.invoke(prompt)
+            search_query: SearchQuery = await ainvoke_structured(SearchQuery, prompt)
             query = search_query.query.strip().replace('"', '')
         except Exception as e:
             print(f"Structured output error: {e}")
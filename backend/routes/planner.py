@@ -1,13 +1,18 @@
+import json
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
-from utils.llm import llm
+from utils.llm_utils import ainvoke_structured, astream_text
+from utils.json_stream import JsonArrayStream
 from datetime import datetime, timedelta
 from firebase_admin import firestore
 from utils.timeline_logger import log_timeline_event
+from db.firebase import db
+from utils.route_utils import get_user_profile, get_user_subjects
+from utils.academic_summary import record_plan
 
 router = APIRouter(prefix="/planner", tags=["planner"])
-db = firestore.client()
 
 # Pydantic Models for Structured Output
 from agents.schemas import Task, DaySchedule, ScheduleResponse
@@ -21,25 +26,9 @@ class PlannerSettings(BaseModel):
     constraints: str
     view_mode: str = "daily"  # 'daily' or 'weekly'
 
-@router.post("/generate", response_model=ScheduleResponse)
-async def generate_plan(settings: PlannerSettings):
-    try:
-        # Fetch user profile to get subjects
-        user_ref = db.collection("user_profiles").document(settings.uid).get()
-        if not user_ref.exists:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_data = user_ref.to_dict()
-        subjects = user_data.get("academic_subjects", [])
-        
-        if not subjects:
-            subjects = ["General Study"]
-
-        # Create structured output LLM
-        structured_llm = llm.with_structured_output(ScheduleResponse)
-
-        # Construct optimized prompt
-        common_instructions = f"""
+def build_plan_prompt(settings: PlannerSettings, subjects: List[str]) -> str:
+    """Construct the schedule prompt for the requested view mode"""
+    common_instructions = f"""
 User Profile:
 - Subjects: {', '.join(subjects)}
 - Study Goal: {settings.available_hours} hours/day
@@ -64,16 +53,16 @@ For every slot, you MUST include:
 - "type": "study" OR "break" OR "other"
 - "duration": duration in minutes (integer)
 - "subject": "Subject Name" (if study) or null"""
-
-        if settings.view_mode == 'daily':
-            today = datetime.now()
-            prompt = f"""Create a detailed daily study schedule for {today.strftime('%A, %Y-%m-%d')}.
+    
+    if settings.view_mode == 'daily':
+        today = datetime.now()
+        return f"""Create a detailed daily study schedule for {today.strftime('%A, %Y-%m-%d')}.
 {common_instructions}
 
 Generate a realistic, achievable daily schedule."""
-        else:
-            start_date = datetime.now()
-            prompt = f"""Create a 7-day study schedule starting {start_date.strftime('%Y-%m-%d')}.
+    
+    start_date = datetime.now()
+    return f"""Create a 7-day study schedule starting {start_date.strftime('%Y-%m-%d')}.
 {common_instructions}
 
 Additional Weekly Requirements:
@@ -84,50 +73,79 @@ Additional Weekly Requirements:
 
 Generate a realistic weekly schedule."""
 
+
+async def save_plan(settings: PlannerSettings, plan_data: dict) -> Optional[str]:
+    """
+    Persist a generated plan to generated_plans and log it to the timeline.
+    
+    Args:
+        settings: Planner settings used for generation
+        plan_data: Dict with ``schedule`` (updated in place with metadata)
+    
+    Returns:
+        The new plan document ID, or None if saving failed
+    """
+    try:
+        plan_data['created_at'] = datetime.utcnow().isoformat()
+        plan_data['view_mode'] = settings.view_mode
+        plan_data['settings'] = {
+            'available_hours': settings.available_hours,
+            'start_time': settings.start_time,
+            'end_time': settings.end_time,
+            'constraints': settings.constraints
+        }
+        
+        plan_ref = await db.collection("user_profiles").document(settings.uid).collection("generated_plans").add(plan_data)
+        plan_id = plan_ref[1].id
+        print(f"Plan saved to Firestore with ID: {plan_id}")
+        await record_plan(settings.uid, plan_data)
+        
+        # Log to Timeline
+        await log_timeline_event(
+            uid=settings.uid,
+            type="schedule",
+            title="Study Plan Generated",
+            description=f"Created daily optimized schedule",
+            icon="Calendar",
+            details=[
+                f"Total: {settings.available_hours}h",
+                f"Mode: {settings.view_mode}",
+                f"Constraints: {settings.constraints[:20]}..." if settings.constraints else "No constraints"
+            ]
+        )
+        return plan_id
+    except Exception as e:
+        print(f"Failed to save plan to Firestore: {str(e)}")
+        return None
+
+
+@router.post("/generate", response_model=ScheduleResponse)
+async def generate_plan(settings: PlannerSettings):
+    try:
+        # Fetch user profile to get subjects (404 for unknown users)
+        await get_user_profile(settings.uid)
+        subjects = await get_user_subjects(settings.uid)
+        prompt = build_plan_prompt(settings, subjects)
+        
         try:
-            # Get structured output directly
-            schedule_data: ScheduleResponse = structured_llm.invoke(prompt)
+            # Get structured output directly (prompt embeds today's date, so never cached)
+            schedule_data: ScheduleResponse = await ainvoke_structured(ScheduleResponse, prompt, cache=False)
             
             # Convert to dict for storage
             plan_data = schedule_data.model_dump()
-            
+        
         except Exception as e:
             print(f"Structured output error: {e}")
             # Fallback schedule
             plan_data = create_fallback_schedule(settings, subjects)
         
         # Save to Firestore
-        try:
-            plan_data['created_at'] = datetime.utcnow().isoformat()
-            plan_data['view_mode'] = settings.view_mode
-            plan_data['settings'] = {
-                'available_hours': settings.available_hours,
-                'start_time': settings.start_time,
-                'end_time': settings.end_time,
-                'constraints': settings.constraints
-            }
-            
-            plan_ref = db.collection("user_profiles").document(settings.uid).collection("generated_plans").add(plan_data)
-            print(f"Plan saved to Firestore with ID: {plan_ref[1].id}")
-            
-            # Log to Timeline
-            await log_timeline_event(
-                uid=settings.uid,
-                type="schedule",
-                title="Study Plan Generated",
-                description=f"Created daily optimized schedule",
-                icon="Calendar",
-                details=[
-                    f"Total: {settings.available_hours}h",
-                    f"Mode: {settings.view_mode}",
-                    f"Constraints: {settings.constraints[:20]}..." if settings.constraints else "No constraints"
-                ]
-            )
-        except Exception as e:
-            print(f"Failed to save plan to Firestore: {str(e)}")
-
+        await save_plan(settings, plan_data)
+        
         return plan_data
-
+    
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -135,17 +153,87 @@ Generate a realistic weekly schedule."""
         raise HTTPException(status_code=500, detail=str(e))
 
 
+STREAM_FORMAT_INSTRUCTIONS = """
+
+Return ONLY a JSON object of the form {"schedule": [{"day": "...", "date": "YYYY-MM-DD", "slots": [...]}, ...]}
+with the days in chronological order. No markdown fences or commentary."""
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_plan_stream(settings: PlannerSettings):
+    """
+    SSE variant of /generate.
+    
+    Emits an ``event: day`` with each DaySchedule as soon as the model has
+    finished writing it, then ``event: done`` with the persisted plan (or
+    ``event: error``). If the stream fails midway, the days it didn't reach
+    are sent from the fallback schedule, like /generate falls back on errors.
+    The assembled plan is saved to generated_plans at the end.
+    """
+    # 404 for unknown users before the stream starts (both reads hit the profile cache)
+    await get_user_profile(settings.uid)
+    subjects = await get_user_subjects(settings.uid)
+    prompt = build_plan_prompt(settings, subjects) + STREAM_FORMAT_INSTRUCTIONS
+    
+    async def event_stream():
+        days = []
+        parser = JsonArrayStream("schedule")
+        failed = False
+        try:
+            async for chunk in astream_text(prompt):
+                for item in parser.feed(chunk):
+                    try:
+                        day = DaySchedule.model_validate(item).model_dump()
+                    except ValidationError as e:
+                        print(f"Skipping invalid streamed day: {e}")
+                        continue
+                    days.append(day)
+                    yield _sse("day", day)
+        except Exception as e:
+            print(f"Planner stream error: {e}")
+            failed = True
+        
+        if failed or not days:
+            # The stream broke off (or produced nothing usable): fill the days it
+            # didn't reach from the fallback schedule, so a half-finished plan is never saved
+            streamed_dates = {day["date"] for day in days}
+            for day in create_fallback_schedule(settings, subjects)["schedule"]:
+                if day["date"] not in streamed_dates:
+                    days.append(day)
+                    yield _sse("day", day)
+            days.sort(key=lambda day: day["date"])
+        plan_data = {"schedule": days}
+        
+        try:
+            plan_id = await save_plan(settings, plan_data)
+            yield _sse("done", {"plan_id": plan_id, "schedule": plan_data["schedule"]})
+        except Exception as e:
+            print(f"Planner stream error: {e}")
+            yield _sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/latest/{uid}", response_model=ScheduleResponse)
 async def get_latest_plan(uid: str):
     try:
         plans_ref = db.collection("user_profiles").document(uid).collection("generated_plans")
-        docs = plans_ref.order_by("created_at", direction=firestore.Query.DESCENDING).limit(1).get()
+        docs = await plans_ref.order_by("created_at", direction=firestore.Query.DESCENDING).limit(1).get()
         
         if not docs:
             return {"schedule": []}
-              
+        
         return docs[0].to_dict()
-
+    
     except Exception as e:
         print(f"Error fetching latest plan: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -204,7 +292,7 @@ def create_fallback_schedule(settings: PlannerSettings, subjects: List[str]) ->
             "subject": subjects[(i+2) % len(subjects)],
             "duration": 120
         })
-
+        
         # Dinner break (Added)
         slots.append({
             "time": "21:00-22:00",
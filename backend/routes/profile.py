@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from db.firebase import db
+from utils.profile_cache import profile_cache
 from datetime import datetime
 
 router = APIRouter(prefix="/profile", tags=["user-profile"])
@@ -37,19 +38,19 @@ async def create_user_profile(profile: UserProfile):
         
         # Check if profile exists
         doc_ref = db.collection('user_profiles').document(profile.uid)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if doc.exists:
             # Update existing profile
-            doc_ref.update(profile_data)
+            await doc_ref.update(profile_data)
         else:
             # Create new profile
             profile_data['created_at'] = datetime.utcnow().isoformat()
-            doc_ref.set(profile_data)
+            await doc_ref.set(profile_data)
         
-        # Fetch and return the created/updated profile
-        updated_doc = doc_ref.get()
-        return UserProfileResponse(**updated_doc.to_dict())
+        # Fetch and return the created/updated profile (re-warms the cache)
+        profile_cache.invalidate(profile.uid)
+        return UserProfileResponse(**await profile_cache.get(profile.uid))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create profile: {str(e)}")
@@ -60,13 +61,12 @@ async def get_user_profile(uid: str):
     Get user profile by UID
     """
     try:
-        doc_ref = db.collection('user_profiles').document(uid)
-        doc = doc_ref.get()
+        profile_data = await profile_cache.get(uid)
         
-        if not doc.exists:
+        if profile_data is None:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        return UserProfileResponse(**doc.to_dict())
+        return UserProfileResponse(**profile_data)
     
     except HTTPException:
         raise
@@ -83,7 +83,7 @@ async def update_user_profile(uid: str, profile: UserProfile):
             raise HTTPException(status_code=400, detail="UID mismatch")
         
         doc_ref = db.collection('user_profiles').document(uid)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Profile not found")
@@ -91,11 +91,11 @@ async def update_user_profile(uid: str, profile: UserProfile):
         profile_data = profile.model_dump()
         profile_data['updated_at'] = datetime.utcnow().isoformat()
         
-        doc_ref.update(profile_data)
+        await doc_ref.update(profile_data)
         
-        # Fetch and return the updated profile
-        updated_doc = doc_ref.get()
-        return UserProfileResponse(**updated_doc.to_dict())
+        # Fetch and return the updated profile (re-warms the cache)
+        profile_cache.invalidate(uid)
+        return UserProfileResponse(**await profile_cache.get(uid))
     
     except HTTPException:
         raise
@@ -109,12 +109,13 @@ async def delete_user_profile(uid: str):
     """
     try:
         doc_ref = db.collection('user_profiles').document(uid)
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        doc_ref.delete()
+        await doc_ref.delete()
+        profile_cache.invalidate(uid)
         return {"message": f"Profile for user {uid} deleted successfully"}
     
     except HTTPException:
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Optional
-from utils.llm import llm as vision_llm # Use the vision capable LLM (Gemini 2.5 Flash)
-from utils.llm2 import llm # Use secondary for generation if needed, or stick to one.
+from utils.llm_utils import ainvoke_structured, ainvoke_text
 from db.firebase import db
 from datetime import datetime
 import uuid
 import base64
 from langchain_core.messages import HumanMessage
 from utils.timeline_logger import log_timeline_event
+from utils.sidehustle_summary import record_project_assigned, record_project_completed
+from utils.activity_counter import log_activity_alert
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -55,7 +56,7 @@ async def generate_project_internal(uid: str, skill_name: str = None, difficulty
         # If no specific skill, look at roadmaps (fallback logic)
         if not skill_name:
             roadmaps_ref = user_ref.collection("roadmaps")
-            roadmaps = [doc.to_dict() for doc in roadmaps_ref.stream()]
+            roadmaps = [doc.to_dict() async for doc in roadmaps_ref.stream()]
             if roadmaps:
                  # Simple selection for now
                  skill_context = f"Focus on {roadmaps[0].get('skill')}."
@@ -64,8 +65,6 @@ async def generate_project_internal(uid: str, skill_name: str = None, difficulty
 
         difficulty = difficulty_override or "Beginner"
 
-        structured_llm = llm.with_structured_output(Project)
-        
         prompt = f"""Generate a practical side hustle project.
         Context: {skill_context}
         Difficulty: {difficulty}
@@ -84,7 +83,7 @@ async def generate_project_internal(uid: str, skill_name: str = None, difficulty
         - xp_reward: {100 if difficulty == 'Beginner' else 300 if difficulty == 'Intermediate' else 500}
         """
         
-        project_data = structured_llm.invoke(prompt)
+        project_data = await ainvoke_structured(Project, prompt, cache=False)
         
         # Save to Firestore
         new_project = project_data.model_dump()
@@ -92,7 +91,8 @@ async def generate_project_internal(uid: str, skill_name: str = None, difficulty
         new_project['created_at'] = datetime.now().isoformat()
         new_project['in_portfolio'] = False
         
-        user_ref.collection("projects").document(new_project['id']).set(new_project)
+        await user_ref.collection("projects").document(new_project['id']).set(new_project)
+        await record_project_assigned(uid, new_project)
         
         # Log to Timeline
         await log_timeline_event(
@@ -130,7 +130,7 @@ async def submit_project(submission: ProjectSubmission):
     try:
         # 1. Fetch project details
         project_ref = db.collection("user_profiles").document(submission.uid).collection("projects").document(submission.project_id)
-        doc = project_ref.get()
+        doc = await project_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Project not found")
@@ -170,36 +170,36 @@ async def submit_project(submission: ProjectSubmission):
             ]
         )
         
-        # 3. Call Vision LLM
+        # 3. Call Vision LLM (every pooled Gemini model accepts image input)
         # Note: We need a structured output, but for Vision input with LangChain, 
         # mixing structured output + image_url can sometimes be tricky depending on the wrapper.
         # We'll try direct invocation processing the json string if needed, or strict prompt.
         
         # Using the json_mode or structured output if supported for multimodal
         # For simplicity/safety, we'll try a standard invoke and parse.
-        response = vision_llm.invoke([message])
-        content = response.content.replace('```json', '').replace('```', '').strip()
+        response = await ainvoke_text([message])
+        content = response.replace('```json', '').replace('```', '').strip()
         
         import json
         result = json.loads(content)
         
         # 4. Handle Result
         if result.get('passed'):
-            project_ref.update({
+            completed_at = datetime.now().isoformat()
+            await project_ref.update({
                 "status": "completed",
                 "in_portfolio": True,
-                "completed_at": datetime.now().isoformat(),
+                "completed_at": completed_at,
                 "grade": result.get('grade'),
                 "feedback": result.get('feedback')
             })
+            if project_data.get('status') != 'completed':
+                await record_project_completed(submission.uid, submission.project_id, completed_at,
+                                               in_portfolio=not project_data.get('in_portfolio', False))
             
             # Log activity
             try:
-                db.collection("user_profiles").document(submission.uid).collection("activity_alerts").add({
-                    "message": f"Completed project: {project_data.get('title')}",
-                    "type": "success",
-                    "created_at": datetime.now().isoformat()
-                })
+                await log_activity_alert(submission.uid, f"Completed project: {project_data.get('title')}", "success")
 
                 # Log Practice Session (Update Weekly Stats)
                 est_time_str = project_data.get('estimated_time', '0')
@@ -211,7 +211,7 @@ async def submit_project(submission: ProjectSubmission):
                     hours = sum(numbers) / len(numbers)
                 
                 if hours > 0:
-                    db.collection("user_profiles").document(submission.uid).collection("practice_sessions").add({
+                    await db.collection("user_profiles").document(submission.uid).collection("practice_sessions").add({
                         "date": datetime.now(),
                         "duration": int(hours * 60), # Convert to minutes
                         "type": "project",
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from firebase_admin import firestore
 from datetime import datetime
+from db.firebase import db
+from utils.profile_cache import profile_cache
 from typing import Dict, List
-from utils.llm import llm
+from utils.llm_utils import ainvoke_text
+import asyncio
 import os
 import json
 
 router = APIRouter(prefix="/resume", tags=["resume"])
-db = firestore.client()
 
 @router.post("/generate/{uid}")
 async def generate_resume(uid: str):
@@ -16,20 +18,18 @@ async def generate_resume(uid: str):
     """
     try:
         user_ref = db.collection("user_profiles").document(uid)
-        profile_doc = user_ref.get()
+        profile_data = await profile_cache.get(uid)
         
-        if not profile_doc.exists:
+        if profile_data is None:
             raise HTTPException(status_code=404, detail="User not found")
         
-        profile_data = profile_doc.to_dict()
-        
         # Get email from profile or Firebase auth
         email = profile_data.get('email')
         if not email:
             # Try to get from Firebase Auth
             from firebase_admin import auth
             try:
-                user = auth.get_user(uid)
+                user = await asyncio.to_thread(auth.get_user, uid)
                 email = user.email or 'Not provided'
             except:
                 email = 'Not provided'
@@ -46,11 +46,11 @@ async def generate_resume(uid: str):
         
         # Fetch skills
         skills_ref = user_ref.collection("skills")
-        skills = [doc.to_dict() for doc in skills_ref.stream()]
+        skills = [doc.to_dict() async for doc in skills_ref.stream()]
         
         # Fetch completed projects
         projects_ref = user_ref.collection("projects").where("status", "==", "completed")
-        projects = [doc.to_dict() for doc in projects_ref.stream()]
+        projects = [doc.to_dict() async for doc in projects_ref.stream()]
         
         # Prepare context for AI
         context = f"""
@@ -116,10 +116,11 @@ Return ONLY valid JSON with this structure:
 """
         
         # Generate resume using Gemini via langchain
-        response = llm.invoke(context)
+        # Regenerating is an explicit user action, so always produce a new draft
+        response = await ainvoke_text(context, cache=False)
         
         # Parse the response
-        resume_text = response.content.strip()
+        resume_text = response.strip()
         
         # Remove markdown code blocks if present
         if resume_text.startswith("```json"):
@@ -144,7 +145,7 @@ Return ONLY valid JSON with this structure:
         resume_ref = user_ref.collection("resumes").document()
         resume_data['id'] = resume_ref.id
         resume_data['generated_at'] = datetime.now().isoformat()
-        resume_ref.set(resume_data)
+        await resume_ref.set(resume_data)
         
         return {
             "success": True,
@@ -169,7 +170,7 @@ async def get_latest_resume(uid: str):
         user_ref = db.collection("user_profiles").document(uid)
         resumes_ref = user_ref.collection("resumes").order_by("generated_at", direction=firestore.Query.DESCENDING).limit(1)
         
-        resumes = list(resumes_ref.stream())
+        resumes = await resumes_ref.get()
         
         if not resumes:
             raise HTTPException(status_code=404, detail="No resume found. Please generate one first.")
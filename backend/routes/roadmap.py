@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Optional
-from utils.llm2 import llm
+from utils.llm_utils import ainvoke_structured
 from db.firebase import db
 from datetime import datetime
 from routes.projects import generate_project_internal
+from utils.sidehustle_summary import record_skill
+from utils.activity_counter import log_activity_alert
+from utils.roadmap_templates import get_template, save_template, is_stale, instantiate_template, template_key
 
 router = APIRouter(prefix="/roadmap", tags=["roadmap"])
 
@@ -46,19 +49,39 @@ class ToggleResponse(BaseModel):
     new_project: Optional[dict] = None
 
 @router.post("/generate", response_model=RoadmapResponse)
-async def generate_roadmap(request: GenerateRoadmapRequest):
+async def generate_roadmap(request: GenerateRoadmapRequest, background_tasks: BackgroundTasks):
     try:
         # Check if exists in DB
         doc_ref = db.collection("user_profiles").document(request.uid).collection("roadmaps").document(request.skill.lower())
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if doc.exists:
             return doc.to_dict()
 
-        # Generate with LLM
-        structured_llm = llm.with_structured_output(RoadmapResponse)
+        # Reuse the shared template for this skill/level if one exists
+        template = await get_template(request.skill, request.current_level)
         
-        prompt = f"""Create a detailed, step-by-step learning roadmap for "{request.skill}" for a {request.current_level} level learner.
+        if template:
+            if is_stale(template):
+                background_tasks.add_task(refresh_roadmap_template, request.skill, request.current_level)
+        else:
+            phases = await generate_roadmap_phases(request.skill, request.current_level)
+            template = await save_template(request.skill, request.current_level, {"phases": phases})
+        
+        # Copy into the user's roadmap with fresh progress state
+        data = instantiate_template(template, request.skill)
+        await doc_ref.set(data)
+        
+        return data
+
+    except Exception as e:
+        print(f"Roadmap generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def generate_roadmap_phases(skill: str, current_level: str, cache: bool = True) -> List[dict]:
+    """Generate roadmap phases for a skill/level with the LLM"""
+    prompt = f"""Create a detailed, step-by-step learning roadmap for "{skill}" for a {current_level} level learner.
         Break it down into 3-4 distinct phases (e.g., Fundamentals, Core Concepts, Advanced Topics, Projects).
         
         For each phase, provide 3-5 specific topics (RoadmapItems).
@@ -71,36 +94,38 @@ async def generate_roadmap(request: GenerateRoadmapRequest):
         
         Ensure the output matches the RoadmapResponse schema exactly.
         """
-        
-        # Invoke LLM
-        result = structured_llm.invoke(prompt)
-        
-        # Prepare data for Firebase
-        data = result.model_dump()
-        data['skill'] = request.skill # Ensure skill name is correct
-        data['last_updated'] = datetime.now().isoformat()
-        
-        # Ensure completed is False by default
-        for phase in data['phases']:
-            for item in phase['items']:
-                item['completed'] = False
-                
-        # Save to Firebase
-        doc_ref.set(data)
-        
-        return data
+    
+    # Invoke LLM
+    result = await ainvoke_structured(RoadmapResponse, prompt, cache=cache)
+    return result.model_dump()['phases']
 
-    except Exception as e:
-        print(f"Roadmap generation error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
 
-        raise HTTPException(status_code=500, detail=str(e))
+# Template keys currently being regenerated in this worker
+_refreshing_templates = set()
+
+
+async def refresh_roadmap_template(skill: str, current_level: str):
+    """Regenerate a stale shared template (runs as a background task)"""
+    key = template_key(skill, current_level)
+    if key in _refreshing_templates:
+        return
+    
+    _refreshing_templates.add(key)
+    try:
+        # Bypass the response cache, otherwise the refresh would return the old roadmap
+        phases = await generate_roadmap_phases(skill, current_level, cache=False)
+        await save_template(skill, current_level, {"phases": phases})
+        print(f"Refreshed roadmap template {key}")
+    except Exception as e:
+        print(f"Roadmap template refresh failed for {key}: {e}")
+    finally:
+        _refreshing_templates.discard(key)
  
 @router.post("/toggle", response_model=ToggleResponse)
 async def toggle_progress(request: UpdateProgressRequest):
     try:
         doc_ref = db.collection("user_profiles").document(request.uid).collection("roadmaps").document(request.skill.lower())
-        doc = doc_ref.get()
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Roadmap not found")
@@ -119,7 +144,7 @@ async def toggle_progress(request: UpdateProgressRequest):
             if found: break
         
         if found:
-            doc_ref.update(data)
+            await doc_ref.update(data)
             
             # Log activity if completed
             if request.completed:
@@ -132,11 +157,7 @@ async def toggle_progress(request: UpdateProgressRequest):
                                 item_title = item['title']
                                 break
                     
-                    db.collection("user_profiles").document(request.uid).collection("activity_alerts").add({
-                        "message": f"Completed topic: {item_title} in {request.skill}",
-                        "type": "success",
-                        "created_at": datetime.now().isoformat()
-                    })
+                    await log_activity_alert(request.uid, f"Completed topic: {item_title} in {request.skill}", "success")
                 except Exception as e:
                     print(f"Failed to log activity: {e}")
 
@@ -158,19 +179,21 @@ async def toggle_progress(request: UpdateProgressRequest):
                     # Try to find existing skill
                     # We'll use a query since ID might differ from name
                     query = skills_ref.where("name", "==", request.skill).limit(1)
-                    results = list(query.stream())
+                    results = await query.get()
                     
                     if results:
                         # Update existing
-                        results[0].reference.update({"mastery": mastery})
+                        await results[0].reference.update({"mastery": mastery})
+                        await record_skill(request.uid, request.skill, results[0].to_dict().get("status"), mastery)
                     else:
                         # Create new
-                        skills_ref.add({
+                        await skills_ref.add({
                             "name": request.skill,
                             "mastery": mastery,
                             "status": "in_progress",
                             "icon": "Code" 
                         })
+                        await record_skill(request.uid, request.skill, "in_progress", mastery)
             except Exception as e:
                 print(f"Failed to update skill mastery: {e}")
             
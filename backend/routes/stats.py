@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException
 from firebase_admin import firestore
 from datetime import datetime
+from db.firebase import db
+from utils.profile_cache import profile_cache
+from utils.academic_summary import get_summary, rebuild_summary
 import statistics
 
 router = APIRouter(prefix="/stats", tags=["stats"])
-db = firestore.client()
 
 @router.get("/academic/{uid}")
 async def get_academic_stats(uid: str):
@@ -12,13 +14,12 @@ async def get_academic_stats(uid: str):
         user_ref = db.collection("user_profiles").document(uid)
         
         # Fetch Weak Areas
-        profile_doc = user_ref.get()
-        if not profile_doc.exists:
+        profile_data = await profile_cache.get(uid)
+        if profile_data is None:
              raise HTTPException(status_code=404, detail="User not found")
         
         from collections import Counter
         
-        profile_data = profile_doc.to_dict()
         weak_areas_list = profile_data.get('weak_areas', [])
         
         # Calculate frequency of each weak area to determine confidence
@@ -41,49 +42,19 @@ async def get_academic_stats(uid: str):
                 "confidence": confidence
             })
             
-        # Fetch Exams for Readiness
-        exams_ref = user_ref.collection("exams")
+        # Exam readiness, syllabus completion and today's plan come from the running aggregates
+        summary = await get_summary(uid)
+        if summary is None:
+            # First visit (or old layout): backfill from the exams and latest plan once
+            summary = await rebuild_summary(uid)
         
-        # Re-approach: Fetch all exams to list first
-        all_exams = [doc.to_dict() for doc in exams_ref.stream()]
+        count = summary.get('exam_count', 0)
+        avg_readiness = round(summary.get('readiness_sum', 0) / count) if count > 0 else 0
+        avg_syllabus = round(summary.get('completion_sum', 0) / count) if count > 0 else 0
         
-        total_readiness = 0
-        total_syllabus_progress = 0
-        count = len(all_exams)
-        
-        for data in all_exams:
-            total_readiness += data.get('readiness_score', 0)
-            
-            # Syllabus completion calculation
-            completed = data.get('completed_topics', 0)
-            total = data.get('total_topics', 0)
-            if total > 0:
-                total_syllabus_progress += (completed / total) * 100
-                
-        avg_readiness = round(total_readiness / count) if count > 0 else 0
-        avg_syllabus = round(total_syllabus_progress / count) if count > 0 else 0
-        
-        # Calculate Study Hours Today from Plan
-        plans_ref = user_ref.collection("generated_plans").order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
-        plan_docs = plans_ref.get()
-        
-        study_hours_today = 0
-        if plan_docs:
-            plan_data = plan_docs[0].to_dict()
-            schedule = plan_data.get('schedule', [])
-            
-            # Find today's date string
-            today_str = datetime.now().strftime('%Y-%m-%d')
-            
-            # If generated today or covers today
-            for day in schedule:
-                # Simple check: matches date OR if it's a daily plan generated today
-                # For daily plan, usually only 1 item in list.
-                # We'll trust the plan's day if it matches or if it's the only one and recent.
-                if day.get('date') == today_str or (len(schedule) == 1 and plan_data.get('created_at', '').startswith(today_str)):
-                    for slot in day.get('slots', []):
-                        if slot.get('type') == 'study':
-                            study_hours_today += slot.get('duration', 0)
+        # Study Hours Today from the latest plan
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        study_hours_today = summary.get('study_minutes', {}).get(today_str, 0)
                             
         study_hours_str = f"{round(study_hours_today / 60, 1)}h"
 
@@ -94,7 +65,7 @@ async def get_academic_stats(uid: str):
         performance_data = []
         accuracies = []
         
-        for doc in history_docs:
+        async for doc in history_docs:
             data = doc.to_dict()
             score = data.get('score', 0)
             accuracies.append(score)
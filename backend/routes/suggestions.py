@@ -1,8 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import List
-from utils.llm import llm
+from utils.llm_utils import ainvoke_structured
 from utils.route_utils import handle_error
+from utils.suggestion_catalog import get_entry, save_entry, record_request
 
 router = APIRouter(prefix="/suggestions", tags=["ai-suggestions"])
 
@@ -18,19 +19,43 @@ class SuggestionRequest(BaseModel):
     major: str
 
 @router.post("/generate", response_model=SuggestionResponse)
-async def generate_suggestions(request: SuggestionRequest):
+async def generate_suggestions(request: SuggestionRequest, background_tasks: BackgroundTasks):
     """
     Generate academic subjects and side hustle interests based on degree/major using AI
     """
     try:
-        # Create structured output LLM
-        structured_llm = llm.with_structured_output(SuggestionResponse)
+        background_tasks.add_task(record_request, request.degree, request.major)
         
-        # Concise prompt
-        prompt = f"""You are an academic advisor AI. Based on the student's degree and major, suggest relevant subjects and side hustle interests.
+        # Common degree/major pairs are served straight from the catalog
+        entry = await get_entry(request.degree, request.major)
+        if entry:
+            return SuggestionResponse(
+                subjects=entry["subjects"],
+                side_hustle_interests=entry["side_hustle_interests"]
+            )
+        
+        try:
+            # Get structured output
+            suggestions = await generate_suggestions_for(request.degree, request.major)
+        except Exception as e:
+            print(f"Structured output error: {e}")
+            # Return fallback (not stored, so the next request tries the LLM again)
+            return create_fallback_suggestions(request.major)
+        
+        await save_entry(request.degree, request.major, suggestions.model_dump())
+        return suggestions
+    
+    except Exception as e:
+        raise handle_error(e, "AI Suggestion")
+
 
-Degree: {request.degree}
-Major: {request.major}
+async def generate_suggestions_for(degree: str, major: str, cache: bool = True) -> SuggestionResponse:
+    """Ask the LLM for subjects and side hustle interests for a degree/major"""
+    # Concise prompt
+    prompt = f"""You are an academic advisor AI. Based on the student's degree and major, suggest relevant subjects and side hustle interests.
+
+Degree: {degree}
+Major: {major}
 
 Requirements:
 1. Suggest EXACTLY 6 core subjects typically studied in this major
@@ -42,18 +67,7 @@ Example for Computer Science:
 - Subjects: Data Structures, Algorithms, Database Systems, Operating Systems, Computer Networks, Software Engineering
 - Side Hustle: Web Development, Mobile App Development, AI/ML, Cloud Computing, Cybersecurity, UI/UX Design"""
 
-        try:
-            # Get structured output
-            suggestions: SuggestionResponse = structured_llm.invoke(prompt)
-            return suggestions
-        
-        except Exception as e:
-            print(f"Structured output error: {e}")
-            # Return fallback
-            return create_fallback_suggestions(request.major)
-    
-    except Exception as e:
-        raise handle_error(e, "AI Suggestion")
+    return await ainvoke_structured(SuggestionResponse, prompt, cache=cache)
 
 
 @router.get("/health")
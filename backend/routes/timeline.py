@@ -1,41 +1,92 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from firebase_admin import firestore
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
+import base64
+import json
+from db.firebase import db
+from utils.profile_cache import profile_cache
 
 router = APIRouter(prefix="/timeline", tags=["timeline"])
-db = firestore.client()
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """Opaque cursor pointing just past an event (its created_at and document ID)"""
+    raw = json.dumps({"t": created_at.isoformat(), "id": doc_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """
+    Turn a cursor from ``encode_cursor`` back into ``start_after`` values.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {"created_at": datetime.fromisoformat(raw["t"]), "__name__": raw["id"]}
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
 
 @router.get("/events/{uid}")
-async def get_timeline_events(uid: str, mode: str = "academic"):
+async def get_timeline_events(
+    uid: str,
+    mode: str = "academic",
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     """
     Get AI agent timeline events based on user activity and agent decisions
+    
+    Events are returned newest first, ``limit`` at a time. Pass the returned
+    ``next_cursor`` as ``after`` to fetch the next page; it is None on the last page.
     """
     try:
         user_ref = db.collection("user_profiles").document(uid)
-        profile_doc = user_ref.get()
-        
-        if not profile_doc.exists:
+        if await profile_cache.get(uid) is None:
             raise HTTPException(status_code=404, detail="User not found")
         
+        try:
+            start_after = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         events = []
         event_id = 1
+        next_cursor = None
         
-        # Fetch Logged Events
-        # Optimization: Filter by mode in-memory to avoid Firestore Composite Index requirement
-        events_ref = user_ref.collection("timeline_events").order_by("created_at", direction=firestore.Query.DESCENDING).limit(50)
+        # Fetch Logged Events (served by the mode + created_at composite index in firestore.indexes.json)
+        events_ref = (
+            user_ref.collection("timeline_events")
+            .where("mode", "==", mode)
+            .order_by("created_at", direction=firestore.Query.DESCENDING)
+            .order_by("__name__", direction=firestore.Query.DESCENDING)
+        )
+        if start_after:
+            events_ref = events_ref.start_after(start_after)
+        # One extra row tells whether another page exists
+        events_ref = events_ref.limit(limit + 1)
         
         try:
              stream = events_ref.stream()
-             for doc in stream:
+             last_shown = None
+             async for doc in stream:
                  data = doc.to_dict()
                  
-                 # Manual Filter
-                 if data.get('mode') != mode:
-                     continue
-                 
                  created_at = data.get('created_at')
                  
+                 if len(events) == limit:
+                      # The extra row: there is a next page, starting after the last event shown
+                      if last_shown and last_shown[0]:
+                           next_cursor = encode_cursor(*last_shown)
+                      break
+                 last_shown = (created_at, doc.id)
+                 
                  # Handle timestamp
                  if not created_at:
                       created_at = datetime.now()
@@ -56,7 +107,7 @@ async def get_timeline_events(uid: str, mode: str = "academic"):
              print(f"Error fetching timeline events from collection: {e}")
 
         # If empty, add default welcome event
-        if not events:
+        if not events and not after:
             events.append({
                 "id": "welcome",
                 "type": "schedule",
@@ -72,8 +123,10 @@ async def get_timeline_events(uid: str, mode: str = "academic"):
                 ]
             })
         
-        return {"events": events}
+        return {"events": events, "next_cursor": next_cursor}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Timeline Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
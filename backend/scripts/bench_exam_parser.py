@@ -0,0 +1,105 @@
+"""
+Benchmark the deterministic exam extractor against the LLM fallback.
+
+Usage (from the backend directory):
+    python -m scripts.bench_exam_parser
+    python -m scripts.bench_exam_parser --llm    # also time the LLM on every case
+
+Runs ``benchmarks/exam_parse_corpus.json`` through ``extract_exam`` and
+reports how many inputs skip the LLM (confidence at or above the threshold),
+how many of those match the expected parse, and the local latency. With
+--llm each case is also sent through ``ainvoke_structured`` to measure the
+latency that a local hit saves; otherwise --llm-latency is used as the
+per-call estimate.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.schemas import ExamInfo
+from agents.tools.exam_extractor import CONFIDENCE_THRESHOLD, extract_exam
+
+DEFAULT_CORPUS = "benchmarks/exam_parse_corpus.json"
+
+
+def matches(exam: ExamInfo, expected: dict) -> bool:
+    return (exam.subject == expected["subject"] and exam.exam_date == expected["exam_date"]
+            and [t.lower() for t in exam.topics] == [t.lower() for t in expected["topics"]])
+
+
+async def time_llm(cases) -> float:
+    from utils.llm_utils import ainvoke_structured
+    latencies = []
+    for case in cases:
+        start = time.perf_counter()
+        try:
+            await ainvoke_structured(ExamInfo, f"Extract exam information (subject, YYYY-MM-DD date, topics).\nText: {case['text']}", cache=False)
+        except Exception as e:
+            print(f"LLM call failed: {e}")
+            continue
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies) if latencies else 0.0
+
+
+def run(corpus_path: str, threshold: float, use_llm: bool, llm_latency: float):
+    with open(corpus_path) as f:
+        corpus = json.load(f)
+    today = date.fromisoformat(corpus["today"])
+    cases = corpus["cases"]
+
+    hits = correct = wrong = 0
+    latencies = []
+    for case in cases:
+        start = time.perf_counter()
+        exam, confidence = extract_exam(case["text"], corpus["subjects"], today=today)
+        latencies.append(time.perf_counter() - start)
+
+        hit = exam is not None and confidence >= threshold
+        expected = case.get("expected")
+        if hit:
+            hits += 1
+            if expected and matches(exam, expected):
+                correct += 1
+            else:
+                wrong += 1
+        status = ("HIT " if hit else "LLM ") + ("ok" if hit and expected and matches(exam, expected) else "!!" if hit else "")
+        print(f"{status:8} {confidence:.2f}  {case['text'][:70]}")
+        if hit and not (expected and matches(exam, expected)):
+            print(f"         got {exam.model_dump()} expected {expected}")
+
+    if use_llm:
+        llm_latency = asyncio.run(time_llm(cases))
+        source = "measured"
+    else:
+        source = "assumed"
+
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    print()
+    print(f"Cases:            {len(cases)}")
+    print(f"Local hits:       {hits} ({hits / len(cases):.0%}) at threshold {threshold}")
+    print(f"Hit accuracy:     {correct}/{hits} correct, {wrong} wrong")
+    print(f"Local latency:    p50 {latencies_ms[len(latencies_ms) // 2]:.3f} ms, max {latencies_ms[-1]:.3f} ms")
+    print(f"LLM latency:      {llm_latency:.2f} s per call ({source})")
+    print(f"LLM calls saved:  {hits}, ~{hits * llm_latency:.1f} s of latency across the corpus")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deterministic exam parsing")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus JSON file")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD, help="Confidence needed to skip the LLM")
+    parser.add_argument("--llm", action="store_true", help="Time the LLM on every case (uses API quota)")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Assumed LLM latency in seconds without --llm")
+    args = parser.parse_args()
+
+    run(args.corpus, args.threshold, args.llm, args.llm_latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Migrate exam syllabi to the keyed-map layout.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_exam_syllabi
+    python -m scripts.migrate_exam_syllabi --dry-run
+    python -m scripts.migrate_exam_syllabi --restart
+
+Walks every ``user_profiles/*/exams`` document in document-ID order and
+rewrites legacy list syllabi (topic names or {name, completed} dicts) as the
+keyed map from ``utils/syllabus.py``, stamping ``schema_version`` so the
+request handlers can skip the legacy conversion. Writes go through a
+BulkWriter, which commits batches in parallel and backs off when throttled.
+After each page the last document is saved to the checkpoint file, so an
+interrupted run picks up where it stopped; already-migrated exams are skipped.
+Writes the BulkWriter gives up on after MAX_WRITE_ATTEMPTS are reported as
+failed, and the checkpoint stops advancing at the first page with a failure
+so the next run retries them.
+"""
+import argparse
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db.firebase import sync_db
+from utils.syllabus import SYLLABUS_SCHEMA_VERSION, is_current, syllabus_to_map
+
+DEFAULT_CHECKPOINT = ".exam_migration_checkpoint.json"
+
+
+def load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_path": None, "scanned": 0, "migrated": 0}
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+MAX_WRITE_ATTEMPTS = 5
+
+
+class WriteTally:
+    """Outcome of the BulkWriter's writes; its callbacks run on worker threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.migrated = 0
+        self.failed = 0
+
+    def on_result(self, reference, result, bulk_writer):
+        with self.lock:
+            self.migrated += 1
+
+    def on_error(self, error, bulk_writer) -> bool:
+        if error.attempts < MAX_WRITE_ATTEMPTS:
+            return True
+        with self.lock:
+            self.failed += 1
+        print(f"Failed to migrate {error.operation.reference.path}: {error.message}")
+        return False
+
+
+def migrate(page_size: int, checkpoint_path: str, dry_run: bool):
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint["last_path"]:
+        print(f"Resuming after {checkpoint['last_path']} "
+              f"({checkpoint['scanned']} scanned, {checkpoint['migrated']} migrated)")
+
+    tally = WriteTally()
+    writer = sync_db.bulk_writer()
+    writer.on_write_result(tally.on_result)
+    writer.on_write_error(tally.on_error)
+
+    query = sync_db.collection_group("exams").order_by("__name__")
+    cursor = checkpoint["last_path"]
+    would_migrate = 0
+    # Migrated writes already added to the checkpoint's running total
+    counted = 0
+    while True:
+        page = query.limit(page_size)
+        if cursor:
+            page = page.start_after(sync_db.document(cursor).get())
+        docs = list(page.stream())
+        if not docs:
+            break
+
+        for doc in docs:
+            data = doc.to_dict()
+            if is_current(data):
+                continue
+            syllabus = data.get("syllabus") or {}
+            update = {"schema_version": SYLLABUS_SCHEMA_VERSION}
+            if not isinstance(syllabus, dict):
+                update["syllabus"] = syllabus_to_map(syllabus)
+            if dry_run:
+                would_migrate += 1
+            else:
+                writer.update(doc.reference, update)
+
+        # Only checkpoint once this page's writes are committed, and never past a failed
+        # write: the next run rescans from there (migrated exams are skipped)
+        writer.flush()
+        cursor = docs[-1].reference.path
+        checkpoint["scanned"] += len(docs)
+        if not dry_run and not tally.failed:
+            checkpoint["last_path"] = cursor
+            checkpoint["migrated"] += tally.migrated - counted
+            counted = tally.migrated
+            save_checkpoint(checkpoint_path, checkpoint)
+        if dry_run:
+            print(f"Scanned {checkpoint['scanned']}, {would_migrate} would be migrated")
+        else:
+            print(f"Scanned {checkpoint['scanned']}, migrated {tally.migrated}, failed {tally.failed}")
+
+    writer.close()
+    if dry_run:
+        print(f"Done: {checkpoint['scanned']} exams scanned, {would_migrate} would be migrated")
+        return
+    print(f"Done: {checkpoint['scanned']} exams scanned, {tally.migrated} migrated, {tally.failed} failed")
+    if tally.failed:
+        print(f"Checkpoint kept before the first failed page; rerun to retry the {tally.failed} failed exams")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate legacy exam syllabi to the keyed-map layout")
+    parser.add_argument("--page-size", type=int, default=500, help="Exams read per page (and per checkpoint)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
+    parser.add_argument("--dry-run", action="store_true", help="Count exams that need migrating without writing")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    migrate(args.page_size, args.checkpoint, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Rebuild the materialized side-hustle summary documents.
+
+Usage (from the backend directory):
+    python -m scripts.rebuild_sidehustle_summaries
+    python -m scripts.rebuild_sidehustle_summaries --uid <uid>
+
+Recomputes ``user_profiles/{uid}/summaries/sidehustle`` from the skills and
+projects subcollections, and the heatmap's ``activity_counts/{year}``
+documents from ``activity_alerts``. Dashboards backfill both lazily on first
+read; run this to backfill every user up front, or for a single user whose
+summary drifted.
+"""
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db.firebase import db
+from utils.sidehustle_summary import rebuild_summary
+from utils.activity_counter import rebuild_activity_counts
+
+
+async def rebuild(uid: str, concurrency: int):
+    if uid:
+        uids = [uid]
+    else:
+        uids = [doc.id async for doc in db.collection("user_profiles").select([]).stream()]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    rebuilt = failed = 0
+
+    async def rebuild_user(user_id: str):
+        nonlocal rebuilt, failed
+        async with semaphore:
+            try:
+                summary = await rebuild_summary(user_id)
+                alerts = await rebuild_activity_counts(user_id)
+                rebuilt += 1
+                print(f"Rebuilt {user_id}: {len(summary['skills'])} skills, "
+                      f"{summary['projects_completed']} completed projects, {alerts} activity alerts")
+            except Exception as e:
+                failed += 1
+                print(f"Failed {user_id}: {e}")
+
+    await asyncio.gather(*(rebuild_user(u) for u in uids))
+    print(f"Done: {rebuilt} rebuilt, {failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild side-hustle dashboard summaries")
+    parser.add_argument("--uid", help="Only rebuild this user")
+    parser.add_argument("--concurrency", type=int, default=8, help="Users rebuilt in parallel")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild(args.uid, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Pre-generate onboarding suggestions for the most common degree/major pairs.
+
+Usage (from the backend directory):
+    python -m scripts.warm_suggestion_catalog --top 50
+    python -m scripts.warm_suggestion_catalog --top 20 --refresh
+
+Candidates are the most requested pairs recorded in the catalog followed by
+the built-in seed list. Pairs that already have suggestions are skipped
+unless --refresh is given.
+"""
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import db.firebase  # noqa: F401  (initializes the Firebase app)
+from routes.suggestions import generate_suggestions_for
+from utils.suggestion_catalog import (
+    SEED_PAIRS, catalog_key, get_entry, save_entry, top_requested
+)
+
+
+async def candidate_pairs(top: int):
+    """Most requested pairs first, then seeds, de-duplicated by catalog key"""
+    seen = set()
+    pairs = []
+    for degree, major in (await top_requested(top)) + SEED_PAIRS:
+        if not degree or not major:
+            continue
+        key = catalog_key(degree, major)
+        if key in seen:
+            continue
+        seen.add(key)
+        pairs.append((degree, major))
+    return pairs[:top]
+
+
+async def warm(top: int, refresh: bool, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    generated = skipped = failed = 0
+
+    async def warm_pair(degree: str, major: str):
+        nonlocal generated, skipped, failed
+        if not refresh and await get_entry(degree, major):
+            skipped += 1
+            return
+        async with semaphore:
+            try:
+                # Bypass the response cache when refreshing so the entry is actually regenerated
+                suggestions = await generate_suggestions_for(degree, major, cache=not refresh)
+                await save_entry(degree, major, suggestions.model_dump())
+                generated += 1
+                print(f"Generated {degree} / {major}")
+            except Exception as e:
+                failed += 1
+                print(f"Failed {degree} / {major}: {e}")
+
+    await asyncio.gather(*(warm_pair(d, m) for d, m in await candidate_pairs(top)))
+    print(f"Done: {generated} generated, {skipped} already cached, {failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the degree/major suggestion catalog")
+    parser.add_argument("--top", type=int, default=50, help="Number of pairs to warm")
+    parser.add_argument("--refresh", action="store_true", help="Regenerate pairs that already exist")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel LLM calls")
+    args = parser.parse_args()
+
+    asyncio.run(warm(args.top, args.refresh, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Running academic aggregates per user.
+
+``user_profiles/{uid}/summaries/academic`` holds what ``/stats/academic``
+would otherwise compute by streaming every exam and walking the latest plan:
+the exam count, the sums of readiness scores and syllabus completion
+percentages, and the planned study minutes per date of the latest plan.
+Exam writers add a ``exam_delta`` update to the same batch or transaction as
+their exam write so both land together; ``rebuild_summary`` recomputes it
+from scratch in a transaction (used lazily when the stats endpoint finds no
+summary).
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from firebase_admin import firestore
+from db.firebase import db
+
+SUMMARY_DOC = "academic"
+
+# Bump when the summary layout changes so old documents get rebuilt
+SUMMARY_VERSION = 1
+
+
+def summary_ref(uid: str):
+    return db.collection("user_profiles").document(uid).collection("summaries").document(SUMMARY_DOC)
+
+
+def exam_completion(exam: Dict[str, Any]) -> float:
+    """Syllabus completion of an exam document in percent"""
+    total = exam.get('total_topics', 0)
+    return (exam.get('completed_topics', 0) / total) * 100 if total > 0 else 0.0
+
+
+def exam_delta(exams: int = 0, readiness: float = 0, completion: float = 0) -> Dict[str, Any]:
+    """
+    Merge-set payload applying a change to the exam aggregates.
+
+    Args:
+        exams: Change in the number of exams
+        readiness: Change in the sum of readiness scores
+        completion: Change in the sum of completion percentages
+
+    Returns:
+        Dict for ``set(..., merge=True)`` on ``summary_ref(uid)``
+    """
+    update: Dict[str, Any] = {"updated_at": datetime.utcnow().isoformat()}
+    if exams:
+        update["exam_count"] = firestore.Increment(exams)
+    if readiness:
+        update["readiness_sum"] = firestore.Increment(readiness)
+    if completion:
+        update["completion_sum"] = firestore.Increment(completion)
+    return update
+
+
+def plan_study_minutes(plan: Dict[str, Any]) -> Dict[str, int]:
+    """Planned study minutes per date ('YYYY-MM-DD') in a generated plan"""
+    schedule = plan.get('schedule', [])
+    minutes: Dict[str, int] = {}
+    for day in schedule:
+        # A single-day plan counts for the day it was generated
+        dates = [day.get('date')]
+        if len(schedule) == 1 and plan.get('created_at'):
+            dates.append(plan['created_at'][:10])
+        study = sum(slot.get('duration', 0) for slot in day.get('slots', []) if slot.get('type') == 'study')
+        for date in set(d for d in dates if d):
+            minutes[date] = minutes.get(date, 0) + study
+    return minutes
+
+
+async def record_plan(uid: str, plan: Dict[str, Any]):
+    """Replace the study minutes with those of a newly generated plan"""
+    try:
+        await summary_ref(uid).set({
+            "study_minutes": plan_study_minutes(plan),
+            "updated_at": datetime.utcnow().isoformat()
+        }, merge=["study_minutes", "updated_at"])
+    except Exception as e:
+        print(f"Failed to update academic summary: {e}")
+
+
+async def get_summary(uid: str) -> Optional[Dict[str, Any]]:
+    """The user's summary, or None if it is missing or from an older layout"""
+    doc = await summary_ref(uid).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    return data if data.get("version", 0) >= SUMMARY_VERSION else None
+
+
+async def rebuild_summary(uid: str) -> Dict[str, Any]:
+    """
+    Recompute the summary from the exams and the latest generated plan.
+
+    Args:
+        uid: User ID
+
+    Returns:
+        The summary document that was written
+    """
+    user_ref = db.collection("user_profiles").document(uid)
+    plans_query = user_ref.collection("generated_plans").order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
+
+    # Reads and the write share a transaction, so an exam_delta that lands
+    # meanwhile makes it retry instead of being overwritten
+    @firestore.async_transactional
+    async def apply_rebuild(transaction) -> Dict[str, Any]:
+        exam_count = 0
+        readiness_sum = 0
+        completion_sum = 0.0
+        async for doc in await transaction.get(user_ref.collection("exams")):
+            exam = doc.to_dict()
+            exam_count += 1
+            readiness_sum += exam.get('readiness_score', 0)
+            completion_sum += exam_completion(exam)
+
+        plan_docs = [doc async for doc in await transaction.get(plans_query)]
+
+        summary = {
+            "exam_count": exam_count,
+            "readiness_sum": readiness_sum,
+            "completion_sum": completion_sum,
+            "study_minutes": plan_study_minutes(plan_docs[0].to_dict()) if plan_docs else {},
+            "version": SUMMARY_VERSION,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        transaction.set(summary_ref(uid), summary)
+        return summary
+
+    return await apply_rebuild(db.transaction())
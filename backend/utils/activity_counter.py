@@ -0,0 +1,108 @@
+"""
+Per-day activity counters backing the dashboard heatmap.
+
+Each activity alert also increments ``counts[YYYY-MM-DD]`` in
+``user_profiles/{uid}/activity_counts/{year}``, so a year of activity is one
+small document instead of a scan over every ``activity_alerts`` entry.
+Alerts written before the counters existed are counted once by
+``rebuild_activity_counts``, which runs lazily the first time a user's
+heatmap is read (``activity_counts/meta`` records that it has run).
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from firebase_admin import firestore
+from db.firebase import db
+from utils.route_utils import get_documents
+
+
+def counts_ref(uid: str, year: int):
+    return db.collection("user_profiles").document(uid).collection("activity_counts").document(str(year))
+
+
+def meta_ref(uid: str):
+    return db.collection("user_profiles").document(uid).collection("activity_counts").document("meta")
+
+
+async def log_activity_alert(uid: str, message: str, type: str = "info"):
+    """
+    Write an activity alert and count it for today.
+
+    Args:
+        uid: User ID
+        message: Alert text shown on the dashboard
+        type: Alert type (success, info, warning)
+    """
+    now = datetime.now()
+    created_at = now.isoformat()
+    batch = db.batch()
+    batch.set(db.collection("user_profiles").document(uid).collection("activity_alerts").document(), {
+        "message": message,
+        "type": type,
+        "created_at": created_at
+    })
+    batch.set(counts_ref(uid, now.year), {
+        "counts": {created_at[:10]: firestore.Increment(1)}
+    }, merge=True)
+    await batch.commit()
+
+
+async def get_daily_activity(uid: str, days: int = 365) -> List[Dict[str, Any]]:
+    """
+    Activity counts per day for the last ``days`` days.
+
+    Returns:
+        List of {"date": "YYYY-MM-DD", "count": n}, oldest first
+    """
+    today = datetime.now()
+    start_day = today - timedelta(days=days)
+    start = start_day.strftime("%Y-%m-%d")
+    years = range(start_day.year, today.year + 1)
+    refs = [counts_ref(uid, year) for year in years]
+
+    # Every year the window touches, in one batched read
+    docs = await get_documents(refs + [meta_ref(uid)])
+    if not docs.get(meta_ref(uid).path, {}).get("backfilled"):
+        # First read for this user: count the alerts from before the counters existed
+        try:
+            await rebuild_activity_counts(uid)
+            docs = await get_documents(refs)
+        except Exception as e:
+            print(f"Failed to backfill activity counts: {e}")
+    counts: Dict[str, int] = {}
+    for ref in refs:
+        counts.update(docs.get(ref.path, {}).get("counts", {}))
+
+    return [{"date": date, "count": count} for date, count in sorted(counts.items()) if date >= start and count]
+
+
+async def rebuild_activity_counts(uid: str) -> int:
+    """
+    Recompute the counter documents from ``activity_alerts`` (backfill).
+
+    Runs in a transaction that reads the alerts, so an alert logged meanwhile
+    (whose batch also increments a counter) makes it retry instead of having
+    its increment overwritten.
+
+    Returns:
+        Number of alerts counted
+    """
+    alerts_query = db.collection("user_profiles").document(uid).collection("activity_alerts")
+
+    @firestore.async_transactional
+    async def apply_rebuild(transaction) -> int:
+        by_year: Dict[str, Dict[str, int]] = {}
+        total = 0
+        async for doc in await transaction.get(alerts_query):
+            date_str = str(doc.to_dict().get("created_at", ""))[:10]
+            if len(date_str) == 10:
+                by_year.setdefault(date_str[:4], {})
+                by_year[date_str[:4]][date_str] = by_year[date_str[:4]].get(date_str, 0) + 1
+                total += 1
+
+        for year, counts in by_year.items():
+            transaction.set(counts_ref(uid, int(year)), {"counts": counts})
+        transaction.set(meta_ref(uid), {"backfilled": True, "rebuilt_at": datetime.now().isoformat()})
+        return total
+
+    return await apply_rebuild(db.transaction())
@@ -0,0 +1,99 @@
+"""
+Incremental parsing of a JSON array while an LLM is still streaming it.
+
+``JsonArrayStream`` is fed raw text chunks and returns every element of the
+target array as soon as its closing brace arrives, so callers can forward
+completed items (e.g. one DaySchedule) before the whole document is done.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+class JsonArrayStream:
+    """Yield complete objects from ``{"<key>": [ {...}, {...} ]}`` as text arrives."""
+    
+    def __init__(self, array_key: str):
+        self._start_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        # State of the object currently being scanned
+        self._obj_start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    @property
+    def text(self) -> str:
+        """Everything received so far"""
+        return self._buffer
+    
+    @property
+    def done(self) -> bool:
+        """Whether the closing bracket of the array has been seen"""
+        return self._done
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add a chunk of streamed text.
+        
+        Args:
+            chunk: Next piece of model output
+        
+        Returns:
+            Array elements completed by this chunk, in order
+        """
+        self._buffer += chunk
+        completed = []
+        
+        if self._done:
+            return completed
+        
+        if not self._in_array:
+            match = self._start_pattern.search(self._buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._pos = match.end()
+        
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            
+            if self._obj_start is None:
+                if char == "{":
+                    self._obj_start = i
+                    self._depth = 1
+                elif char == "]":
+                    self._done = True
+                    i += 1
+                    break
+                i += 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(buffer[self._obj_start:i + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed streamed item: {e}")
+                    self._obj_start = None
+            i += 1
+        
+        self._pos = i
+        return completed
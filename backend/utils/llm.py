@@ -4,10 +4,19 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+DEFAULT_TEMPERATURE = 0.7
+
+
+def create_llm(api_key: str, model: str = DEFAULT_MODEL) -> ChatGoogleGenerativeAI:
+    """Build a Gemini chat client with the app-wide generation settings"""
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=8192
+    )
+
+
 # Initialize LLM with API key from environment
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite",
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-    max_tokens=8192
-)
\ No newline at end of file
+llm = create_llm(os.getenv("GOOGLE_API_KEY"))
@@ -1,13 +0,0 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Initialize LLM with secondary API key from environment
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite",
-    google_api_key=os.getenv("GOOGLE_API_KEY2"),
-    temperature=0.7,
-    max_tokens=8192
-)
@@ -0,0 +1,238 @@
+"""
+Content-addressed cache for LLM responses.
+
+Keys are derived from (model, temperature, schema name/version, normalized
+prompt), so identical requests are answered from the cache instead of a new
+generation. Backends are tiered: an in-process LRU with TTL in front of an
+on-disk SQLite store that survives restarts.
+
+Configuration (environment):
+    LLM_CACHE_ENABLED       "0" disables caching entirely.
+    LLM_CACHE_TTL_SECONDS   Lifetime of a cached response.
+    LLM_CACHE_MAX_ENTRIES   Size of the in-process LRU tier.
+    LLM_CACHE_DB_PATH       SQLite file for the disk tier ("" to disable).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk cache tier backed by a single SQLite table."""
+
+    blocking = True
+
+    def __init__(self, path: str, ttl: float = 86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Tiered cache: lookups go through the backends in order and a hit in a
+    slower tier is copied into the faster tiers in front of it.
+    """
+
+    def __init__(self, backends: List[Any], enabled: bool = True):
+        self.backends = backends
+        self.enabled = enabled and bool(backends)
+        self.hits = [0] * len(backends)
+        self.misses = 0
+        self.bypassed = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        backends: List[Any] = [LRUCache(int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")), ttl)]
+
+        db_path = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.sqlite3")
+        if db_path:
+            try:
+                backends.append(SQLiteCache(db_path, ttl))
+            except sqlite3.Error as e:
+                print(f"LLM cache: disk tier disabled ({e})")
+
+        return cls(backends, enabled=os.getenv("LLM_CACHE_ENABLED", "1") != "0")
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        for i, backend in enumerate(self.backends):
+            try:
+                value = backend.get(key)
+            except Exception as e:
+                print(f"LLM cache read error: {e}")
+                continue
+            if value is not None:
+                self.hits[i] += 1
+                for faster in self.backends[:i]:
+                    faster.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled:
+            return
+        for backend in self.backends:
+            try:
+                backend.set(key, value)
+            except Exception as e:
+                print(f"LLM cache write error: {e}")
+
+    async def aget(self, key: str) -> Optional[str]:
+        """``get`` that keeps disk I/O off the event loop."""
+        if any(b.blocking for b in self.backends):
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: str):
+        """``set`` that keeps disk I/O off the event loop."""
+        if any(b.blocking for b in self.backends):
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        total_hits = sum(self.hits)
+        lookups = total_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "tiers": [type(b).__name__ for b in self.backends],
+            "hits_by_tier": list(self.hits),
+            "hits": total_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(total_hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation differences don't split cache entries"""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+@lru_cache(maxsize=None)
+def schema_version(schema: Optional[Type[BaseModel]]) -> str:
+    """Short hash of the JSON schema; changes whenever the model's fields change"""
+    if schema is None:
+        return "text"
+    schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return f"{schema.__name__}:{hashlib.sha256(schema_json.encode()).hexdigest()[:12]}"
+
+
+def make_cache_key(model: str, temperature: float, schema: Optional[Type[BaseModel]], prompt: str) -> str:
+    """
+    Build the content address for an LLM call.
+
+    Args:
+        model: Model name (or names) the call may be served by
+        temperature: Sampling temperature
+        schema: Pydantic model for structured output, or None for plain text
+        prompt: Prompt text
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "schema": schema_version(schema),
+        "prompt": hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+llm_cache = ResponseCache.from_env()
@@ -0,0 +1,419 @@
+"""
+Pool of Gemini clients spread across several API keys.
+
+Each key gets its own requests-per-minute and tokens-per-minute token buckets.
+Calls are dispatched to the least-loaded healthy key, and keys that return a
+quota error (429) are benched for a cooldown period so traffic shifts to the
+remaining keys instead of hammering the exhausted one. A per-key circuit
+breaker opens after consecutive transient failures (429/5xx/timeouts) and
+keeps the key out of rotation until its reset period has passed; the next
+call after that is a single half-open probe (other calls avoid the key while
+it is in flight) that closes or re-opens it. Cancelled calls, such as a hedge
+that lost, count as neither a success nor a failure.
+
+Configuration (environment):
+    GOOGLE_API_KEYS          Comma-separated API keys. Falls back to
+                             GOOGLE_API_KEY / GOOGLE_API_KEY2 when unset.
+    LLM_MODELS               Comma-separated models, one per key (or a single
+                             model used for every key).
+    LLM_KEY_RPM              Requests per minute allowed per key.
+    LLM_KEY_TPM              Tokens per minute allowed per key.
+    LLM_OUTPUT_TOKEN_ESTIMATE  Output tokens reserved per call before the real
+                             usage is known.
+    LLM_QUOTA_COOLDOWN_SECONDS How long a key is benched after a 429.
+    LLM_POOL_ACQUIRE_TIMEOUT Max seconds a call waits for capacity.
+    LLM_BREAKER_THRESHOLD    Consecutive transient failures that open a key's breaker.
+    LLM_BREAKER_RESET_SECONDS  How long an open breaker keeps the key out.
+    LLM_HEDGE_ENABLED        "1" fires a hedged request to another key when a
+                             call runs past the observed p95 latency.
+    LLM_HEDGE_MIN_SAMPLES    Latency samples needed before hedging kicks in.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set
+
+from utils.llm import create_llm, DEFAULT_MODEL
+
+# Gemini bills a fixed amount per inline image regardless of its byte size.
+IMAGE_TOKEN_ESTIMATE = 258
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``capacity`` per minute."""
+    
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.refill_per_second = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+    
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+    
+    def can_consume(self, amount: float) -> bool:
+        # A request larger than the whole bucket is allowed once the bucket is full,
+        # otherwise it could never be served.
+        return self.available() >= min(amount, self.capacity)
+    
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+    
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+    
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.available()
+        return max(missing / self.refill_per_second, 0.0) if missing > 0 else 0.0
+    
+    def utilization(self) -> float:
+        return round(1 - max(self.available(), 0.0) / self.capacity, 3)
+
+
+class PoolMember:
+    """One API key with its client and rate-limit state."""
+    
+    def __init__(self, name: str, api_key: str, model: str, rpm: int, tpm: int):
+        self.name = name
+        self.model = model
+        self.client = create_llm(api_key, model)
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm)
+        self.in_flight = 0
+        self.requests = 0
+        self.tokens_used = 0
+        self.quota_errors = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.breaker_open_until = 0.0
+        self.breaker_trips = 0
+        # A half-open probe call is in flight; other callers keep away until it settles
+        self.probing = False
+        self._structured_clients: Dict[Any, Any] = {}
+    
+    def is_healthy(self) -> bool:
+        now = time.monotonic()
+        return now >= self.cooldown_until and now >= self.breaker_open_until and not self.probing
+    
+    def breaker_state(self) -> str:
+        if time.monotonic() < self.breaker_open_until:
+            return "open"
+        return "half_open" if self.breaker_trips and self.consecutive_failures else "closed"
+    
+    def needs_probe(self, threshold: int) -> bool:
+        """Whether the next call is the half-open probe (breaker tripped, reset period over)"""
+        return self.consecutive_failures >= threshold and time.monotonic() >= self.breaker_open_until
+    
+    def structured_client(self, schema: Any) -> Any:
+        """``with_structured_output(schema, include_raw=True)`` built once per schema"""
+        client = self._structured_clients.get(schema)
+        if client is None:
+            client = self.client.with_structured_output(schema, include_raw=True)
+            self._structured_clients[schema] = client
+        return client
+    
+    def has_capacity(self, estimated_tokens: int) -> bool:
+        return self.rpm.can_consume(1) and self.tpm.can_consume(estimated_tokens)
+    
+    def load(self) -> float:
+        """Higher is busier: the fuller of the two buckets plus requests in flight."""
+        return max(self.rpm.utilization(), self.tpm.utilization()) + self.in_flight * 0.01
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "healthy": self.is_healthy(),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "tokens_used": self.tokens_used,
+            "quota_errors": self.quota_errors,
+            "errors": self.errors,
+            "breaker": self.breaker_state(),
+            "breaker_trips": self.breaker_trips,
+            "rpm_utilization": self.rpm.utilization(),
+            "tpm_utilization": self.tpm.utilization(),
+        }
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether an exception is the provider telling us the key is over quota"""
+    text = f"{type(error).__name__} {error}"
+    return "429" in text or "ResourceExhausted" in text or "RESOURCE_EXHAUSTED" in text
+
+
+_TRANSIENT_MARKERS = (
+    "500", "502", "503", "504", "ServiceUnavailable", "UNAVAILABLE", "InternalServerError",
+    "DeadlineExceeded", "DEADLINE_EXCEEDED", "Timeout", "timed out",
+)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Quota, overload and timeout errors worth retrying on another key"""
+    if is_quota_error(error) or isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    text = f"{type(error).__name__} {error}"
+    return any(marker in text for marker in _TRANSIENT_MARKERS)
+
+
+def estimate_tokens(prompt: Any) -> int:
+    """
+    Rough input token estimate (~4 characters per token).
+    
+    Args:
+        prompt: Prompt string or list of LangChain messages
+    
+    Returns:
+        Estimated number of input tokens
+    """
+    if isinstance(prompt, str):
+        return len(prompt) // 4 + 1
+    
+    total = 0
+    for message in prompt or []:
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            total += len(content) // 4 + 1
+            continue
+        for part in content or []:
+            if isinstance(part, dict) and part.get("type") == "text":
+                total += len(part.get("text", "")) // 4 + 1
+            elif isinstance(part, dict):
+                total += IMAGE_TOKEN_ESTIMATE
+            else:
+                total += len(str(part)) // 4 + 1
+    return total
+
+
+class LLMClientPool:
+    """Dispatches LLM calls across API keys by current load."""
+    
+    def __init__(self, members: List[PoolMember], output_token_estimate: int = 1024,
+                 cooldown_seconds: float = 30.0, acquire_timeout: float = 30.0,
+                 breaker_threshold: int = 3, breaker_reset_seconds: float = 60.0,
+                 hedge_enabled: bool = False, hedge_min_samples: int = 20):
+        if not members:
+            raise ValueError("LLM client pool needs at least one API key")
+        self.members = members
+        self.output_token_estimate = output_token_estimate
+        self.cooldown_seconds = cooldown_seconds
+        self.acquire_timeout = acquire_timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.waits = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Recent successful call latencies per call kind (e.g. schema name)
+        self._latencies: Dict[str, deque] = {}
+    
+    @classmethod
+    def from_env(cls) -> "LLMClientPool":
+        keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()]
+        if not keys:
+            keys = [k for k in (os.getenv("GOOGLE_API_KEY"), os.getenv("GOOGLE_API_KEY2")) if k]
+        if not keys:
+            # Keep the previous behaviour of a single client relying on ambient credentials
+            keys = [None]
+        
+        models = [m.strip() for m in os.getenv("LLM_MODELS", "").split(",") if m.strip()] or [DEFAULT_MODEL]
+        rpm = int(os.getenv("LLM_KEY_RPM", "15"))
+        tpm = int(os.getenv("LLM_KEY_TPM", "250000"))
+        
+        members = [
+            PoolMember(f"key-{i + 1}", key, models[i] if i < len(models) else models[-1], rpm, tpm)
+            for i, key in enumerate(keys)
+        ]
+        return cls(
+            members,
+            output_token_estimate=int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024")),
+            cooldown_seconds=float(os.getenv("LLM_QUOTA_COOLDOWN_SECONDS", "30")),
+            acquire_timeout=float(os.getenv("LLM_POOL_ACQUIRE_TIMEOUT", "30")),
+            breaker_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "3")),
+            breaker_reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "60")),
+            hedge_enabled=os.getenv("LLM_HEDGE_ENABLED", "0") == "1",
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        )
+    
+    @property
+    def model_names(self) -> str:
+        """Models served by the pool, used to namespace cached responses"""
+        return ",".join(sorted({m.model for m in self.members}))
+    
+    def _candidates(self, exclude: Optional[Set[str]] = None) -> List[PoolMember]:
+        exclude = exclude or set()
+        healthy = [m for m in self.members if m.is_healthy() and m.name not in exclude]
+        if healthy:
+            return healthy
+        # Every key is benched or excluded: fall back to anything not excluded
+        return [m for m in self.members if m.name not in exclude] or self.members
+    
+    def _charge(self, member: PoolMember, estimated_tokens: int) -> PoolMember:
+        if member.needs_probe(self.breaker_threshold):
+            # Only this call goes to the recovering key until it succeeds or fails
+            member.probing = True
+        member.rpm.consume(1)
+        member.tpm.consume(estimated_tokens)
+        member.in_flight += 1
+        member.requests += 1
+        return member
+    
+    async def acquire(self, estimated_tokens: int, exclude: Optional[Set[str]] = None) -> PoolMember:
+        """
+        Wait until some healthy key has rate-limit headroom and reserve it.
+        
+        Args:
+            estimated_tokens: Estimated input tokens for the call
+            exclude: Member names that must not be chosen (e.g. the key that just failed)
+        
+        Returns:
+            The reserved pool member; pass it back to ``release`` when done
+        """
+        estimated_tokens += self.output_token_estimate
+        deadline = time.monotonic() + self.acquire_timeout
+        
+        while True:
+            candidates = self._candidates(exclude)
+            ready = [m for m in candidates if m.is_healthy() and m.has_capacity(estimated_tokens)]
+            if ready:
+                return self._charge(min(ready, key=lambda m: m.load()), estimated_tokens)
+            
+            if time.monotonic() >= deadline:
+                # Give up waiting and let the provider decide rather than failing locally
+                return self._charge(min(candidates, key=lambda m: m.load()), estimated_tokens)
+            
+            self.waits += 1
+            now = time.monotonic()
+            wait = min(
+                max(m.cooldown_until - now, 0.0) or max(m.rpm.seconds_until(1), m.tpm.seconds_until(estimated_tokens))
+                for m in candidates
+            )
+            await asyncio.sleep(min(max(wait, 0.05), 1.0, max(deadline - now, 0.05)))
+    
+    def release(self, member: PoolMember, estimated_tokens: int, actual_tokens: Optional[int] = None,
+                error: Optional[Exception] = None, cancelled: bool = False):
+        """
+        Return a member after a call, reconciling the token estimate with real usage.
+        
+        Args:
+            member: Member returned by ``acquire``
+            estimated_tokens: The same input estimate passed to ``acquire``
+            actual_tokens: Total tokens reported by the provider, if known
+            error: Exception raised by the call, if any
+            cancelled: The call was abandoned (e.g. a hedge that lost); counts as neither
+                a success nor a failure
+        """
+        member.in_flight = max(member.in_flight - 1, 0)
+        member.probing = False
+        reserved = estimated_tokens + self.output_token_estimate
+        
+        if actual_tokens is not None:
+            member.tokens_used += actual_tokens
+            if actual_tokens < reserved:
+                member.tpm.refund(reserved - actual_tokens)
+            else:
+                member.tpm.consume(actual_tokens - reserved)
+        
+        if cancelled:
+            return
+        if error is None:
+            member.consecutive_failures = 0
+            return
+        
+        member.errors += 1
+        if is_quota_error(error):
+            member.quota_errors += 1
+            member.cooldown_until = time.monotonic() + self.cooldown_seconds
+            print(f"LLM pool: {member.name} hit quota, cooling down for {self.cooldown_seconds}s")
+        
+        if is_transient_error(error):
+            member.consecutive_failures += 1
+            # A failed half-open probe re-opens immediately since the count is still over the threshold
+            if member.consecutive_failures >= self.breaker_threshold:
+                member.breaker_trips += 1
+                member.breaker_open_until = time.monotonic() + self.breaker_reset_seconds
+                print(f"LLM pool: circuit open for {member.name} after "
+                      f"{member.consecutive_failures} failures, retrying in {self.breaker_reset_seconds}s")
+    
+    def record_latency(self, kind: str, seconds: float):
+        """Remember how long a successful call of this kind took"""
+        self._latencies.setdefault(kind, deque(maxlen=200)).append(seconds)
+    
+    def hedge_delay(self, kind: str) -> Optional[float]:
+        """
+        Seconds to wait before hedging a call of this kind, or None to not hedge.
+        Hedging needs a second key to go to and enough samples for a stable p95.
+        """
+        samples = self._latencies.get(kind)
+        if not self.hedge_enabled or len(self.members) < 2 or not samples or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    
+    @asynccontextmanager
+    async def lease(self, prompt: Any, exclude: Optional[Set[str]] = None):
+        """
+        Async context manager yielding a reserved member for one call.
+        Usage is reconciled from ``lease.usage`` when the caller sets it.
+        """
+        estimated = estimate_tokens(prompt)
+        member = await self.acquire(estimated, exclude)
+        lease = _Lease(member)
+        error = None
+        cancelled = False
+        try:
+            yield lease
+        except Exception as e:
+            error = e
+            raise
+        except BaseException:
+            # Cancelled (a losing hedge) or a streaming consumer that stopped early:
+            # says nothing about the key's health, so don't reset or bump its failure count
+            cancelled = True
+            raise
+        finally:
+            self.release(member, estimated, lease.usage, error=error, cancelled=cancelled)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization snapshot for the health endpoint."""
+        members = [m.stats() for m in self.members]
+        return {
+            "keys": len(self.members),
+            "healthy_keys": sum(1 for m in members if m["healthy"]),
+            "in_flight": sum(m["in_flight"] for m in members),
+            "capacity_waits": self.waits,
+            "open_breakers": sum(1 for m in members if m["breaker"] == "open"),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "members": members,
+        }
+
+
+class _Lease:
+    """Handle given to callers of ``LLMClientPool.lease``."""
+    
+    def __init__(self, member: PoolMember):
+        self.member = member
+        self.client = member.client
+        self.usage: Optional[int] = None
+    
+    def record_usage(self, message: Any):
+        """Pick up total token usage from an AIMessage, if the provider reported it"""
+        usage = getattr(message, "usage_metadata", None) or {}
+        if usage.get("total_tokens") is not None:
+            self.usage = usage["total_tokens"]
+
+
+llm_pool = LLMClientPool.from_env()
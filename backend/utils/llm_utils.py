@@ -1,63 +1,281 @@
 """
-LLM utilities with retry logic and error handling for structured output
+LLM utilities with retry logic and error handling for structured output.
+
+This module is the gateway every route goes through to reach Gemini. The
+``ainvoke_*`` helpers are the async equivalents of ``.invoke()`` so handlers
+never block the event loop while a generation is in flight. Each call is
+dispatched to the least-loaded API key in ``utils.llm_pool``, and
+responses are cached by content in ``utils.llm_cache`` unless the caller
+opts out with ``cache=False`` (e.g. prompts that embed the current date).
+Concurrent cache misses for the same key share one in-flight generation
+via ``utils.single_flight``.
+
+Retries back off exponentially with full jitter and move to another key
+after a transient provider error. With ``LLM_HEDGE_ENABLED=1`` a structured
+call that runs past the p95 latency for its schema gets a second, hedged
+request on another key and the first response to arrive wins.
 """
-from typing import TypeVar, Type, Optional, Callable
+import asyncio
+import os
+import random
+import time
+from typing import TypeVar, Type, Optional, Callable, Union, List, Any, AsyncIterator, Set
 from pydantic import BaseModel
-from utils.llm import llm
+from utils.llm import DEFAULT_TEMPERATURE
+from utils.llm_pool import llm_pool, estimate_tokens, is_transient_error
+from utils.llm_cache import llm_cache, make_cache_key
+from utils.single_flight import llm_flights
 
 T = TypeVar('T', bound=BaseModel)
 
+# Upper bound on generations in flight per worker so a burst of requests
+# cannot open an unbounded number of sockets to the provider.
+_llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "32")))
+
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def _extract_parsed(result: Any) -> Any:
+    """Unwrap the parsed object from an ``include_raw=True`` structured result."""
+    if isinstance(result, dict) and 'parsed' in result:
+        return result['parsed']
+    return result
+
+
+def _usage_tokens(result: Any) -> Optional[int]:
+    """Total tokens reported on the raw AIMessage of a call result, if any."""
+    raw = result.get('raw') if isinstance(result, dict) else result
+    usage = getattr(raw, 'usage_metadata', None) or {}
+    return usage.get('total_tokens')
+
+
+def _cache_key(schema: Optional[Type[BaseModel]], prompt: Any, cache: bool) -> Optional[str]:
+    """Cache key for a call, or None when the call must not be cached."""
+    if not cache or not llm_cache.enabled:
+        llm_cache.bypassed += 1
+        return None
+    if not isinstance(prompt, str):
+        # Multimodal message lists (e.g. screenshots) are never cached
+        return None
+    return make_cache_key(llm_pool.model_names, DEFAULT_TEMPERATURE, schema, prompt)
+
+
+def _structured_output(result: Any) -> Any:
+    """Parsed output of an ``include_raw=True`` call, raising on parse failures."""
+    if isinstance(result, dict) and result.get('parsing_error') is not None:
+        raise result['parsing_error']
+    output = _extract_parsed(result)
+    if output is None:
+        raise ValueError("LLM returned no structured output")
+    return output
+
+
+async def _attempt_structured(schema: Type[T], prompt: str, tried: Set[str]) -> T:
+    """One structured-output generation on the least-loaded key not in ``tried``."""
+    async with _llm_semaphore:
+        async with llm_pool.lease(prompt, exclude=tried) as lease:
+            tried.add(lease.member.name)
+            started = time.monotonic()
+            result = await lease.member.structured_client(schema).ainvoke(prompt)
+            lease.usage = _usage_tokens(result)
+    output = _structured_output(result)
+    llm_pool.record_latency(schema.__name__, time.monotonic() - started)
+    return output
+
+
+async def _call_structured(schema: Type[T], prompt: str, tried: Optional[Set[str]] = None) -> T:
+    """
+    Structured-output generation, hedged onto a second key when it runs slow.
+    
+    Args:
+        schema: Pydantic model class for structured output
+        prompt: The prompt to send to the LLM
+        tried: Names of keys already used; updated with the keys this call uses
+    
+    Returns:
+        Parsed instance of ``schema`` from whichever request finished first
+    """
+    tried = tried if tried is not None else set()
+    primary = asyncio.ensure_future(_attempt_structured(schema, prompt, tried))
+    delay = llm_pool.hedge_delay(schema.__name__)
+    if delay is None:
+        return await primary
+    
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        
+        llm_pool.hedges += 1
+        hedge = asyncio.ensure_future(_attempt_structured(schema, prompt, tried))
+        pending.add(hedge)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        llm_pool.hedge_wins += 1
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def ainvoke_structured(schema: Type[T], prompt: str, cache: bool = True) -> T:
+    """
+    Async structured-output call that does not block the event loop.
+    
+    Args:
+        schema: Pydantic model class for structured output
+        prompt: The prompt to send to the LLM
+        cache: Set to False for prompts whose answer must not be reused
+    
+    Returns:
+        Parsed instance of ``schema``
+    
+    Raises:
+        Exception: If the call fails or the output cannot be parsed
+    """
+    key = _cache_key(schema, prompt, cache)
+    if key:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return schema.model_validate_json(cached)
+    
+    async def generate() -> T:
+        output = await _call_structured(schema, prompt)
+        if key:
+            await llm_cache.aset(key, output.model_dump_json())
+        return output
+    
+    if key:
+        return await llm_flights.do(f"structured:{key}", generate)
+    return await generate()
+
 
-def invoke_with_retry(
+async def ainvoke_text(prompt: Union[str, List[Any]], cache: bool = True) -> str:
+    """
+    Async plain-text call that does not block the event loop.
+    
+    Args:
+        prompt: Prompt string or list of LangChain messages (e.g. multimodal input)
+        cache: Set to False for prompts whose answer must not be reused
+    
+    Returns:
+        Text content of the model response
+    """
+    key = _cache_key(None, prompt, cache)
+    if key:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return cached
+    
+    async def generate():
+        async with _llm_semaphore:
+            async with llm_pool.lease(prompt) as lease:
+                response = await lease.client.ainvoke(prompt)
+                lease.usage = _usage_tokens(response)
+        
+        if key and isinstance(response.content, str):
+            await llm_cache.aset(key, response.content)
+        return response.content
+    
+    if key:
+        return await llm_flights.do(f"text:{key}", generate)
+    return await generate()
+
+
+async def astream_text(prompt: Union[str, List[Any]]) -> AsyncIterator[str]:
+    """
+    Stream a plain-text generation chunk by chunk (never cached).
+    
+    Args:
+        prompt: Prompt string or list of LangChain messages
+    
+    Yields:
+        Text chunks as the model produces them
+    """
+    async with _llm_semaphore:
+        async with llm_pool.lease(prompt) as lease:
+            async for chunk in lease.client.astream(prompt):
+                if chunk.usage_metadata:
+                    lease.usage = (lease.usage or 0) + chunk.usage_metadata.get('total_tokens', 0)
+                if isinstance(chunk.content, str) and chunk.content:
+                    yield chunk.content
+
+
+async def ainvoke_with_retry(
     schema: Type[T],
     prompt: str,
     max_retries: int = 3,
-    validation_func: Optional[Callable[[T], bool]] = None
+    validation_func: Optional[Callable[[T], bool]] = None,
+    cache: bool = True
 ) -> T:
     """
-    Invoke LLM with structured output and automatic retry on failure.
+    Invoke the LLM with structured output, retrying on errors and failed validation.
     
     Args:
         schema: Pydantic model class for structured output
         prompt: The prompt to send to the LLM
         max_retries: Maximum number of retry attempts
         validation_func: Optional function to validate the output (returns True if valid)
+        cache: Set to False for prompts whose answer must not be reused
     
     Returns:
         Validated structured output
-        
+    
     Raises:
         Exception: If all retries fail
     """
-    for attempt in range(max_retries):
-        try:
-            # Create structured LLM with include_raw for better error handling
-            structured_llm = llm.with_structured_output(schema, include_raw=True)
-            
-            # Get output
-            result = structured_llm.invoke(prompt)
-            
-            # Extract parsed object
-            if isinstance(result, dict) and 'parsed' in result:
-                output = result['parsed']
-            else:
-                output = result
+    key = _cache_key(schema, prompt, cache)
+    if key:
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return schema.model_validate_json(cached)
+    
+    async def generate() -> T:
+        failed_keys = set()
+        for attempt in range(max_retries):
+            tried = set(failed_keys)
+            try:
+                output = await _call_structured(schema, prompt, tried)
+                
+                if validation_func and not validation_func(output):
+                    print(f"Attempt {attempt + 1}: Validation failed, retrying...")
+                    continue
+                
+                print(f"Successfully generated output on attempt {attempt + 1}")
+                # Only outputs that passed validation are worth reusing
+                if key:
+                    await llm_cache.aset(key, output.model_dump_json())
+                return output
             
-            # Validate if validation function provided
-            if validation_func and not validation_func(output):
-                print(f"Attempt {attempt + 1}: Validation failed, retrying...")
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise Exception(f"All {max_retries} attempts failed. Last error: {str(e)}")
+                if is_transient_error(e):
+                    # Fail over to another key rather than hammering this one
+                    failed_keys |= tried
+                await asyncio.sleep(backoff_delay(attempt))
                 continue
-            
-            print(f"Successfully generated output on attempt {attempt + 1}")
-            return output
         
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {str(e)}")
-            if attempt == max_retries - 1:
-                raise Exception(f"All {max_retries} attempts failed. Last error: {str(e)}")
-            continue
+        raise Exception(f"Failed after {max_retries} attempts")
     
-    raise Exception(f"Failed after {max_retries} attempts")
+    if key:
+        # Validated outputs differ from plain structured calls, so they get their own flight
+        return await llm_flights.do(f"validated:{key}", generate)
+    return await generate()
 
 
 def create_explicit_prompt(base_prompt: str, schema_name: str, requirements: list) -> str:
@@ -0,0 +1,84 @@
+"""
+Read-through cache for ``user_profiles/{uid}`` documents.
+
+Nearly every route reads the caller's profile, but profiles change rarely, so
+each worker keeps recently used profiles in an LRU with a TTL. Routes that
+write a profile call ``profile_cache.invalidate(uid)`` right after the write.
+Other workers pick the change up within the TTL.
+
+Configuration (environment):
+    PROFILE_CACHE_ENABLED       "0" always reads from Firestore.
+    PROFILE_CACHE_TTL_SECONDS   Lifetime of a cached profile.
+    PROFILE_CACHE_MAX_ENTRIES   Number of profiles kept per worker.
+"""
+import copy
+import os
+from typing import Any, Dict, Optional
+
+from db.firebase import db
+from utils.llm_cache import LRUCache
+
+
+class ProfileCache:
+    """TTL+LRU cache of user profile dicts with hit-rate counters."""
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 300, enabled: bool = True):
+        self.enabled = enabled
+        self._lru = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "ProfileCache":
+        return cls(
+            max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "2048")),
+            ttl=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300")),
+            enabled=os.getenv("PROFILE_CACHE_ENABLED", "1") != "0",
+        )
+
+    async def get(self, uid: str) -> Optional[Dict[str, Any]]:
+        """
+        Profile data for a user, read from Firestore on a miss.
+
+        Args:
+            uid: User ID
+
+        Returns:
+            A copy of the profile dict (safe to mutate), or None if the user doesn't exist
+        """
+        if self.enabled:
+            cached = self._lru.get(uid)
+            if cached is not None:
+                self.hits += 1
+                return copy.deepcopy(cached)
+
+        self.misses += 1
+        doc = await db.collection("user_profiles").document(uid).get()
+        if not doc.exists:
+            # Missing profiles aren't cached; onboarding creates them moments later
+            return None
+
+        data = doc.to_dict()
+        if self.enabled:
+            self._lru.set(uid, copy.deepcopy(data))
+        return data
+
+    def invalidate(self, uid: str):
+        """Drop a user's cached profile after writing to it"""
+        self.invalidations += 1
+        self._lru.delete(uid)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+profile_cache = ProfileCache.from_env()
@@ -0,0 +1,195 @@
+"""
+Persistent MCQ question bank behind /assessment/generate.
+
+Questions live in the top-level ``question_bank`` collection, indexed by
+normalized subject, topic and difficulty. The document ID is a hash of the
+subject, topic and normalized question text, so storing the same question
+twice overwrites instead of duplicating it. Each user's served question IDs
+are tracked per subject in ``user_profiles/{uid}/seen_questions`` so sets can
+avoid repeats.
+"""
+import asyncio
+import difflib
+import hashlib
+import os
+import random
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+from db.firebase import db
+from utils.slug import slugify
+
+BANK_COLLECTION = "question_bank"
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Questions fetched per topic when assembling a set
+BANK_FETCH_LIMIT = int(os.getenv("QUESTION_BANK_FETCH_LIMIT", "60"))
+
+# Topics with fewer stored questions than this are topped up in the background
+BANK_MIN_STOCK = int(os.getenv("QUESTION_BANK_MIN_STOCK", "30"))
+
+
+def normalize_difficulty(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    return value if value in DIFFICULTIES else "medium"
+
+
+def question_id(subject: str, topic: str, question: str) -> str:
+    """Deterministic document ID used for de-duplication"""
+    text = re.sub(r"[^a-z0-9]+", " ", question.lower()).strip()
+    digest = hashlib.sha1(f"{slugify(subject)}|{slugify(topic)}|{text}".encode()).hexdigest()
+    return digest[:24]
+
+
+def match_topic(topic_tag: str, topics: List[str], fallback_index: int = 0) -> str:
+    """Map an LLM topic tag back onto one of the requested topics"""
+    tag = slugify(topic_tag or "")
+    keys = [slugify(t) for t in topics]
+    for topic, key in zip(topics, keys):
+        if tag == key or tag in key or key in tag:
+            return topic
+    close = difflib.get_close_matches(tag, keys, n=1, cutoff=0.6)
+    if close:
+        return topics[keys.index(close[0])]
+    return topics[fallback_index % len(topics)]
+
+
+def _to_question(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc_id,
+        "question": data["question"],
+        "options": data["options"],
+        "correct_answer": data["correct_answer"],
+        "topic_tag": data.get("topic_tag") or data.get("topic", "")
+    }
+
+
+async def get_seen_ids(uid: Optional[str], subject: str) -> set:
+    """IDs of bank questions already served to a user for a subject"""
+    if not uid:
+        return set()
+    doc = await db.collection("user_profiles").document(uid).collection("seen_questions").document(slugify(subject)).get()
+    return set(doc.to_dict().get("ids", [])) if doc.exists else set()
+
+
+async def mark_seen(uid: Optional[str], subject: str, ids: List[str]):
+    """Record served question IDs for a user"""
+    if not uid or not ids:
+        return
+    try:
+        await db.collection("user_profiles").document(uid).collection("seen_questions").document(slugify(subject)).set({
+            "ids": firestore.ArrayUnion(ids),
+            "updated_at": datetime.utcnow().isoformat()
+        }, merge=True)
+    except Exception as e:
+        print(f"Failed to record seen questions: {e}")
+
+
+async def assemble_question_set(
+    subject: str,
+    topics: List[str],
+    uid: Optional[str] = None,
+    count: int = 10,
+    difficulty: Optional[str] = None
+) -> Tuple[Optional[List[Dict[str, Any]]], List[str]]:
+    """
+    Build a question set from the bank, avoiding questions the user has seen.
+
+    Args:
+        subject: Subject name
+        topics: Topics to cover; questions are spread across them round-robin
+        uid: Optional user ID for seen-question filtering
+        count: Number of questions in the set
+        difficulty: Optional single difficulty; otherwise difficulties are mixed
+
+    Returns:
+        (questions or None if the bank cannot satisfy the request, topics whose stock is low)
+    """
+    subject_key = slugify(subject)
+
+    def topic_query(topic: str):
+        query = db.collection(BANK_COLLECTION).where("subject_key", "==", subject_key).where(
+            "topic_key", "==", slugify(topic)
+        )
+        if difficulty:
+            query = query.where("difficulty", "==", normalize_difficulty(difficulty))
+        return query.limit(BANK_FETCH_LIMIT).get()
+
+    # Seen IDs and every topic's candidates are fetched concurrently
+    seen, *topic_docs = await asyncio.gather(get_seen_ids(uid, subject), *(topic_query(t) for t in topics))
+    low_stock = []
+    pools = []
+
+    for topic, docs in zip(topics, topic_docs):
+        if len(docs) < BANK_MIN_STOCK:
+            low_stock.append(topic)
+
+        # Group unseen questions by difficulty and interleave them for a mixed set
+        by_difficulty = {d: [] for d in DIFFICULTIES}
+        for doc in docs:
+            if doc.id in seen:
+                continue
+            data = doc.to_dict()
+            by_difficulty[normalize_difficulty(data.get("difficulty"))].append(_to_question(doc.id, data))
+        for group in by_difficulty.values():
+            random.shuffle(group)
+
+        interleaved = []
+        while any(by_difficulty.values()):
+            for d in DIFFICULTIES:
+                if by_difficulty[d]:
+                    interleaved.append(by_difficulty[d].pop())
+        pools.append(interleaved)
+
+    # Round-robin across topics so every requested topic is covered
+    selected = []
+    while len(selected) < count and any(pools):
+        for pool in pools:
+            if pool and len(selected) < count:
+                selected.append(pool.pop(0))
+
+    if len(selected) < count:
+        return None, low_stock
+
+    random.shuffle(selected)
+    return selected, low_stock
+
+
+async def add_questions(subject: str, topics: List[str], questions: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Store generated questions in the bank with one batch write.
+
+    Args:
+        subject: Subject name
+        topics: Requested topics, used to index each question
+        questions: MCQuestion objects from the LLM
+
+    Returns:
+        Questions in API form, with bank IDs as their ``id``
+    """
+    batch = db.batch()
+    stored = []
+    written = set()
+    for i, q in enumerate(questions):
+        topic = match_topic(q.topic_tag, topics, i)
+        doc_id = question_id(subject, topic, q.question)
+        data = {
+            "subject": subject,
+            "subject_key": slugify(subject),
+            "topic": topic,
+            "topic_key": slugify(topic),
+            "difficulty": normalize_difficulty(getattr(q, "difficulty", None)),
+            "question": q.question,
+            "options": q.options,
+            "correct_answer": q.correct_answer,
+            "topic_tag": q.topic_tag,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        if doc_id not in written:
+            batch.set(db.collection(BANK_COLLECTION).document(doc_id), data)
+            written.add(doc_id)
+        stored.append(_to_question(doc_id, data))
+    await batch.commit()
+    return stored
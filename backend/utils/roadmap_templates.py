@@ -0,0 +1,92 @@
+"""
+Global roadmap templates shared across users.
+
+A roadmap generated for a (skill, current_level) pair is stored once in the
+``roadmap_templates`` collection and copied into each user's
+``user_profiles/{uid}/roadmaps/{skill}`` document with fresh progress state.
+Templates carry a version and a generation time so stale ones can be
+refreshed in the background while still being served.
+"""
+import copy
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from db.firebase import db
+from utils.slug import slugify
+
+TEMPLATE_COLLECTION = "roadmap_templates"
+
+# Bump when the roadmap prompt or schema changes so existing templates get regenerated
+TEMPLATE_VERSION = 1
+
+TEMPLATE_MAX_AGE_DAYS = int(os.getenv("ROADMAP_TEMPLATE_MAX_AGE_DAYS", "30"))
+
+
+def template_key(skill: str, current_level: str) -> str:
+    """Document ID of the template for a (skill, level) pair"""
+    return f"{slugify(skill)}__{slugify(current_level)}"
+
+
+async def get_template(skill: str, current_level: str) -> Optional[Dict[str, Any]]:
+    """Fetch the shared template for a skill/level, or None if not generated yet"""
+    doc = await db.collection(TEMPLATE_COLLECTION).document(template_key(skill, current_level)).get()
+    return doc.to_dict() if doc.exists else None
+
+
+async def save_template(skill: str, current_level: str, roadmap: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Store a freshly generated roadmap as the shared template.
+
+    Args:
+        skill: Skill name as requested
+        current_level: Learner level (e.g. "Beginner")
+        roadmap: RoadmapResponse data with ``phases``
+
+    Returns:
+        The stored template document
+    """
+    template = {
+        "skill": skill,
+        "current_level": current_level,
+        "phases": roadmap.get("phases", []),
+        "version": TEMPLATE_VERSION,
+        "generated_at": datetime.utcnow().isoformat()
+    }
+    await db.collection(TEMPLATE_COLLECTION).document(template_key(skill, current_level)).set(template)
+    return template
+
+
+def is_stale(template: Dict[str, Any]) -> bool:
+    """Whether a template should be regenerated (old version or past max age)"""
+    if template.get("version", 0) < TEMPLATE_VERSION:
+        return True
+    try:
+        generated_at = datetime.fromisoformat(template.get("generated_at", ""))
+    except ValueError:
+        return True
+    return datetime.utcnow() - generated_at > timedelta(days=TEMPLATE_MAX_AGE_DAYS)
+
+
+def instantiate_template(template: Dict[str, Any], skill: str) -> Dict[str, Any]:
+    """
+    Build a user's roadmap document from a template with all items incomplete.
+
+    Args:
+        template: Template document from ``get_template``/``save_template``
+        skill: Skill name as the user requested it
+
+    Returns:
+        Roadmap data ready to be written to the user's roadmaps subcollection
+    """
+    phases = copy.deepcopy(template.get("phases", []))
+    for phase in phases:
+        for item in phase.get("items", []):
+            item["completed"] = False
+
+    return {
+        "skill": skill,
+        "phases": phases,
+        "last_updated": datetime.now().isoformat(),
+        "template_version": template.get("version", TEMPLATE_VERSION)
+    }
@@ -1,17 +1,16 @@
 """
 Shared utilities for routes to avoid code repetition
 """
-from firebase_admin import firestore
 from fastapi import HTTPException
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from db.firebase import db
+from utils.profile_cache import profile_cache
 
-db = firestore.client()
 
-
-def get_user_profile(uid: str) -> Dict[str, Any]:
+async def get_user_profile(uid: str) -> Dict[str, Any]:
     """
-    Get user profile from Firestore
+    Get user profile (served from the profile cache when possible)
     
     Args:
         uid: User ID
@@ -22,15 +21,15 @@ def get_user_profile(uid: str) -> Dict[str, Any]:
     Raises:
         HTTPException: If user not found
     """
-    user_ref = db.collection("user_profiles").document(uid).get()
+    profile = await profile_cache.get(uid)
     
-    if not user_ref.exists:
+    if profile is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return user_ref.to_dict()
+    return profile
 
 
-def get_user_subjects(uid: str, default: Optional[list] = None) -> list:
+async def get_user_subjects(uid: str, default: Optional[list] = None) -> list:
     """
     Get user's academic subjects
     
@@ -45,14 +44,14 @@ def get_user_subjects(uid: str, default: Optional[list] = None) -> list:
         default = ["General Study"]
     
     try:
-        profile = get_user_profile(uid)
+        profile = await get_user_profile(uid)
         subjects = profile.get("academic_subjects", [])
         return subjects if subjects else default
     except:
         return default
 
 
-def save_to_firestore(collection: str, uid: str, data: dict, subcollection: Optional[str] = None) -> str:
+async def save_to_firestore(collection: str, uid: str, data: dict, subcollection: Optional[str] = None) -> str:
     """
     Save data to Firestore
     
@@ -71,17 +70,40 @@ def save_to_firestore(collection: str, uid: str, data: dict, subcollection: Opti
         data['updated_at'] = datetime.utcnow().isoformat()
         
         if subcollection:
-            doc_ref = db.collection(collection).document(uid).collection(subcollection).add(data)
+            doc_ref = await db.collection(collection).document(uid).collection(subcollection).add(data)
             return doc_ref[1].id
         else:
             doc_ref = db.collection(collection).document(uid)
-            doc_ref.set(data, merge=True)
+            await doc_ref.set(data, merge=True)
+            if collection == "user_profiles":
+                profile_cache.invalidate(uid)
             return uid
     except Exception as e:
         print(f"Error saving to Firestore: {str(e)}")
         raise
 
 
+async def get_documents(refs: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch many documents in a single batched round trip
+    
+    Args:
+        refs: Document references (duplicates are fetched once)
+        
+    Returns:
+        Mapping of document path to data, for the documents that exist
+    """
+    unique_refs = list({ref.path: ref for ref in refs}.values())
+    if not unique_refs:
+        return {}
+    
+    docs = {}
+    async for snapshot in db.get_all(unique_refs):
+        if snapshot.exists:
+            docs[snapshot.reference.path] = snapshot.to_dict()
+    return docs
+
+
 def format_time_ago(timestamp) -> str:
     """
     Format timestamp to human-readable time ago
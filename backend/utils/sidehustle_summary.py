@@ -0,0 +1,158 @@
+"""
+Materialized side-hustle summary per user.
+
+``user_profiles/{uid}/summaries/sidehustle`` holds everything the side-hustle
+dashboard needs from the ``skills`` and ``projects`` subcollections: skill
+status/mastery, completed and portfolio project counts, the currently
+assigned projects and completions per month. Writers update it incrementally
+right after their own write; ``rebuild_summary`` recomputes it from scratch
+(used for backfill via ``scripts/rebuild_sidehustle_summaries.py`` and
+lazily when a dashboard finds no summary).
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from firebase_admin import firestore
+from db.firebase import db
+from utils.slug import slugify
+
+SUMMARY_DOC = "sidehustle"
+
+# Bump when the summary layout changes so old documents get rebuilt
+# (2: skill keys keep "+"/"#", so C, C++ and C# no longer share one entry)
+SUMMARY_VERSION = 2
+
+# Fields copied from a project into the summary's active project entries
+ACTIVE_PROJECT_FIELDS = ["id", "title", "description", "difficulty", "estimated_time", "skills", "created_at"]
+
+
+def summary_ref(uid: str):
+    return db.collection("user_profiles").document(uid).collection("summaries").document(SUMMARY_DOC)
+
+
+def skill_key(name: str) -> str:
+    """Map key for a skill name ("React.js" -> "react-js", "C++" -> "c-plus-plus")"""
+    return slugify(name)
+
+
+def month_key(timestamp: Any) -> Optional[str]:
+    """'YYYY-MM' for an ISO string or datetime, or None if it can't be parsed"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(timestamp, datetime):
+        return timestamp.strftime("%Y-%m")
+    return None
+
+
+def _active_project(project: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: project.get(field) for field in ACTIVE_PROJECT_FIELDS if field in project}
+
+
+async def get_summary(uid: str) -> Optional[Dict[str, Any]]:
+    """The user's summary, or None if it is missing or from an older layout"""
+    doc = await summary_ref(uid).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    return data if data.get("version", 0) >= SUMMARY_VERSION else None
+
+
+async def record_skill(uid: str, name: str, status: Optional[str] = None, mastery: Optional[int] = None):
+    """Add or update one skill entry after a write to the skills subcollection"""
+    entry: Dict[str, Any] = {"name": name}
+    if status is not None:
+        entry["status"] = status
+    if mastery is not None:
+        entry["mastery"] = mastery
+    try:
+        await summary_ref(uid).set({
+            "skills": {skill_key(name): entry},
+            "updated_at": datetime.utcnow().isoformat()
+        }, merge=True)
+    except Exception as e:
+        print(f"Failed to update side-hustle summary: {e}")
+
+
+async def record_project_assigned(uid: str, project: Dict[str, Any]):
+    """Track a newly generated project as active"""
+    try:
+        await summary_ref(uid).set({
+            "active_projects": {project["id"]: _active_project(project)},
+            "updated_at": datetime.utcnow().isoformat()
+        }, merge=True)
+    except Exception as e:
+        print(f"Failed to update side-hustle summary: {e}")
+
+
+async def record_project_completed(uid: str, project_id: str, completed_at: str, in_portfolio: bool = True):
+    """Move a project from active to completed and count it for its month"""
+    update: Dict[str, Any] = {
+        "active_projects": {project_id: firestore.DELETE_FIELD},
+        "projects_completed": firestore.Increment(1),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    if in_portfolio:
+        update["portfolio_items"] = firestore.Increment(1)
+    month = month_key(completed_at)
+    if month:
+        update["monthly_completions"] = {month: firestore.Increment(1)}
+    try:
+        await summary_ref(uid).set(update, merge=True)
+    except Exception as e:
+        print(f"Failed to update side-hustle summary: {e}")
+
+
+async def rebuild_summary(uid: str) -> Dict[str, Any]:
+    """
+    Recompute the summary from the skills and projects subcollections.
+
+    Args:
+        uid: User ID
+
+    Returns:
+        The summary document that was written
+    """
+    user_ref = db.collection("user_profiles").document(uid)
+
+    skills = {}
+    async for doc in user_ref.collection("skills").stream():
+        data = doc.to_dict()
+        name = data.get("name")
+        if name:
+            skills[skill_key(name)] = {
+                "name": name,
+                "status": data.get("status", "not_started"),
+                "mastery": data.get("mastery", 0)
+            }
+
+    projects_completed = 0
+    portfolio_items = 0
+    active_projects = {}
+    monthly_completions: Dict[str, int] = {}
+    async for doc in user_ref.collection("projects").stream():
+        project = doc.to_dict()
+        project.setdefault("id", doc.id)
+        if project.get("in_portfolio"):
+            portfolio_items += 1
+        if project.get("status") == "completed":
+            projects_completed += 1
+            month = month_key(project.get("completed_at"))
+            if month:
+                monthly_completions[month] = monthly_completions.get(month, 0) + 1
+        elif project.get("status") == "assigned":
+            active_projects[project["id"]] = _active_project(project)
+
+    summary = {
+        "skills": skills,
+        "projects_completed": projects_completed,
+        "portfolio_items": portfolio_items,
+        "active_projects": active_projects,
+        "monthly_completions": monthly_completions,
+        "version": SUMMARY_VERSION,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    await summary_ref(uid).set(summary)
+    return summary
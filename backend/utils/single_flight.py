@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing of identical concurrent LLM calls.
+
+When many students submit the same inputs within seconds (a class working on
+the same assignment), every request would otherwise spend its own generation.
+``SingleFlight.do`` runs the first caller's coroutine as a shared task and
+makes every concurrent caller with the same key await that task instead.
+Coalescing is per worker process; the response cache covers later callers.
+"""
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one in-flight task."""
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.collapsed = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once per key among concurrent callers.
+        
+        Args:
+            key: Identity of the call (e.g. its cache key)
+            fn: Zero-argument coroutine function producing the result
+        
+        Returns:
+            The shared result; followers get their own copy so they can mutate it
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            # Shield so a disconnecting follower doesn't cancel everyone's call
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result)
+        
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+    
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.collapsed
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.leaders,
+            "collapsed": self.collapsed,
+            "collapse_rate": round(self.collapsed / total, 3) if total else 0.0,
+        }
+
+
+llm_flights = SingleFlight()
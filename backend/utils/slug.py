@@ -0,0 +1,18 @@
+"""
+Slugs used in Firestore document IDs and index fields.
+
+Skills, roadmap levels, question bank subjects/topics and suggestion catalog
+degree/major pairs are all keyed by ``slugify`` so the same name always maps
+to the same key.
+"""
+import re
+
+
+def slugify(value: str) -> str:
+    """
+    Lowercase, dash-separated slug of a name.
+
+    "React.js" -> "react-js", "C++" -> "c-plus-plus", "C#" -> "c-sharp"
+    """
+    value = value.strip().lower().replace("+", " plus ").replace("#", " sharp ")
+    return re.sub(r"[^a-z0-9]+", "-", value).strip("-") or "general"
@@ -0,0 +1,145 @@
+"""
+Catalog of precomputed onboarding suggestions keyed by (degree, major).
+
+The set of degree/major pairs students enter is small and repetitive, so the
+``suggestion_catalog`` collection stores one SuggestionResponse per
+normalized pair. Lookups count requests so the warm-up script
+(``scripts/warm_suggestion_catalog.py``) knows which pairs matter most.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+from db.firebase import db
+from utils.slug import slugify
+
+CATALOG_COLLECTION = "suggestion_catalog"
+
+DEGREE_ALIASES = {
+    "btech": "btech", "b tech": "btech", "bachelor of technology": "btech",
+    "be": "be", "bachelor of engineering": "be",
+    "bsc": "bsc", "bachelor of science": "bsc",
+    "bca": "bca", "bachelor of computer applications": "bca",
+    "bba": "bba", "bachelor of business administration": "bba",
+    "bcom": "bcom", "bachelor of commerce": "bcom",
+    "ba": "ba", "bachelor of arts": "ba",
+    "mtech": "mtech", "m tech": "mtech", "master of technology": "mtech",
+    "msc": "msc", "master of science": "msc",
+    "mca": "mca", "master of computer applications": "mca",
+    "mba": "mba", "master of business administration": "mba",
+}
+
+MAJOR_ALIASES = {
+    "cse": "computer science", "cs": "computer science", "comp sci": "computer science",
+    "computer science and engineering": "computer science",
+    "computer science engineering": "computer science",
+    "computer engineering": "computer science",
+    "it": "information technology",
+    "ece": "electronics and communication", "ec": "electronics and communication",
+    "electronics and communication engineering": "electronics and communication",
+    "ee": "electrical engineering", "eee": "electrical engineering",
+    "electrical and electronics engineering": "electrical engineering",
+    "me": "mechanical engineering", "mech": "mechanical engineering", "mechanical": "mechanical engineering",
+    "civil": "civil engineering", "ce": "civil engineering",
+    "aiml": "artificial intelligence and machine learning",
+    "ai ml": "artificial intelligence and machine learning",
+    "ai and ml": "artificial intelligence and machine learning",
+    "ds": "data science",
+}
+
+# Common pairs generated by the warm-up script before any traffic arrives
+SEED_PAIRS: List[Tuple[str, str]] = [
+    ("BTech", "Computer Science"),
+    ("BTech", "Information Technology"),
+    ("BTech", "Electronics and Communication"),
+    ("BTech", "Electrical Engineering"),
+    ("BTech", "Mechanical Engineering"),
+    ("BTech", "Civil Engineering"),
+    ("BTech", "Artificial Intelligence and Machine Learning"),
+    ("BTech", "Data Science"),
+    ("BE", "Computer Science"),
+    ("BCA", "Computer Applications"),
+    ("BSc", "Computer Science"),
+    ("BSc", "Mathematics"),
+    ("BSc", "Physics"),
+    ("BSc", "Chemistry"),
+    ("BCom", "Accounting and Finance"),
+    ("BBA", "Business Administration"),
+    ("BA", "Economics"),
+    ("BA", "Psychology"),
+    ("MCA", "Computer Applications"),
+    ("MBA", "Finance"),
+    ("MBA", "Marketing"),
+    ("MTech", "Computer Science"),
+]
+
+
+def _clean(value: str) -> str:
+    value = value.strip().lower().replace("&", " and ")
+    value = re.sub(r"[.\-_/(),]", " ", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def normalize_degree(degree: str) -> str:
+    """'B.Tech', 'b tech', 'Bachelor of Technology' -> 'btech'"""
+    cleaned = _clean(degree)
+    return DEGREE_ALIASES.get(cleaned) or DEGREE_ALIASES.get(cleaned.replace(" ", "")) or cleaned
+
+
+def normalize_major(major: str) -> str:
+    """'CSE', 'Computer Science & Engineering' -> 'computer science'"""
+    cleaned = _clean(major)
+    return MAJOR_ALIASES.get(cleaned, cleaned)
+
+
+def catalog_key(degree: str, major: str) -> str:
+    """Document ID for a normalized degree/major pair"""
+    return f"{slugify(normalize_degree(degree))}__{slugify(normalize_major(major))}"
+
+
+async def get_entry(degree: str, major: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up stored suggestions for a degree/major pair.
+
+    Returns:
+        Dict with ``subjects`` and ``side_hustle_interests``, or None on a miss
+    """
+    doc = await db.collection(CATALOG_COLLECTION).document(catalog_key(degree, major)).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    if not data.get("subjects") or not data.get("side_hustle_interests"):
+        return None
+    return data
+
+
+async def save_entry(degree: str, major: str, suggestions: Dict[str, Any]):
+    """Store suggestions for a degree/major pair, keeping its request count"""
+    await db.collection(CATALOG_COLLECTION).document(catalog_key(degree, major)).set({
+        "degree": normalize_degree(degree),
+        "major": normalize_major(major),
+        "subjects": suggestions["subjects"],
+        "side_hustle_interests": suggestions["side_hustle_interests"],
+        "generated_at": datetime.utcnow().isoformat()
+    }, merge=True)
+
+
+async def record_request(degree: str, major: str):
+    """Count a lookup so the warm-up script can prioritise popular pairs"""
+    try:
+        await db.collection(CATALOG_COLLECTION).document(catalog_key(degree, major)).set({
+            "degree": normalize_degree(degree),
+            "major": normalize_major(major),
+            "requests": firestore.Increment(1)
+        }, merge=True)
+    except Exception as e:
+        print(f"Failed to record suggestion request: {e}")
+
+
+async def top_requested(limit: int) -> List[Tuple[str, str]]:
+    """Most requested (degree, major) pairs recorded in the catalog"""
+    query = db.collection(CATALOG_COLLECTION).order_by(
+        "requests", direction=firestore.Query.DESCENDING
+    ).limit(limit)
+    return [(data.get("degree"), data.get("major")) for data in [doc.to_dict() async for doc in query.stream()]]
@@ -0,0 +1,55 @@
+"""
+Exam syllabus storage layout.
+
+Exams store ``syllabus`` as a map keyed by topic position
+(``{"t0000": {"name": ..., "completed": ...}, ...}``) so a toggle can update
+``syllabus.<key>.completed`` in place instead of rewriting the whole list.
+Older exam documents hold a list of strings or ``{name, completed}`` dicts
+and no ``schema_version``; ``scripts/migrate_exam_syllabi.py`` converts them.
+The API keeps returning syllabi as lists either way.
+"""
+from typing import Any, Dict, List
+
+# Documents written with the keyed-map layout carry this schema_version
+SYLLABUS_SCHEMA_VERSION = 2
+
+
+def topic_key(index: int) -> str:
+    """Map key of the topic at a syllabus position (3 -> "t0003")"""
+    return f"t{index:04d}"
+
+
+def _topic(item: Any) -> Dict[str, Any]:
+    if isinstance(item, str):
+        return {"name": item, "completed": False}
+    return {"name": item.get("name", ""), "completed": bool(item.get("completed", False))}
+
+
+def syllabus_to_map(items: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """Keyed-map layout for a list of topic names or {name, completed} items"""
+    return {topic_key(i): _topic(item) for i, item in enumerate(items)}
+
+
+def is_current(exam: Dict[str, Any]) -> bool:
+    """Whether an exam document already uses the keyed-map layout"""
+    return exam.get("schema_version", 1) >= SYLLABUS_SCHEMA_VERSION
+
+
+def topics_in_order(syllabus: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Topics of a keyed-map syllabus in syllabus order"""
+    return [syllabus[key] for key in sorted(syllabus)]
+
+
+def syllabus_to_list(syllabus: Any) -> List[Dict[str, Any]]:
+    """
+    Syllabus as an ordered list of {name, completed} dicts.
+
+    Args:
+        syllabus: Stored syllabus in either the keyed-map or a legacy list layout
+
+    Returns:
+        List of topic dicts in syllabus order
+    """
+    if isinstance(syllabus, dict):
+        return [_topic(syllabus[key]) for key in sorted(syllabus, key=lambda k: int(k[1:]))]
+    return [_topic(item) for item in syllabus or []]
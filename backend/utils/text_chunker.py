@@ -0,0 +1,77 @@
+"""
+Token-aware splitting of long documents for map-reduce LLM calls.
+
+Pages are packed greedily into chunks under a token budget. A page that is
+too large on its own is split on section boundaries (headings, numbered
+questions, "Part B", ...), then on paragraphs, and only as a last resort
+by raw length, so a question is rarely cut in half.
+"""
+import re
+from typing import List
+
+from utils.llm_pool import estimate_tokens
+
+# Lines that usually start a new section or question in an assignment brief
+SECTION_PATTERN = re.compile(
+    r"^\s*(?:#{1,6}\s+\S"
+    r"|(?:question|q|task|problem|exercise|part|section)\s*[\dA-Za-z]{1,3}\b"
+    r"|\d{1,2}\s*[.)]\s+\S"
+    r"|\([a-z0-9]{1,3}\)\s+\S"
+    r"|[A-Z][A-Z0-9 ,:&-]{6,}$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def split_sections(text: str) -> List[str]:
+    """Split text before every line that looks like a heading or question number"""
+    starts = sorted({0} | {m.start() for m in SECTION_PATTERN.finditer(text)})
+    sections = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    return [s for s in sections if s.strip()]
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Break a block over the budget into sections, then paragraphs, then fixed-size pieces"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    
+    for splitter in (split_sections, lambda t: re.split(r"\n\s*\n", t)):
+        parts = [p for p in splitter(text) if p.strip()]
+        if len(parts) > 1:
+            pieces = []
+            for part in parts:
+                pieces.extend(_split_oversized(part, max_tokens))
+            return pieces
+    
+    max_chars = max_tokens * 4
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def chunk_pages(pages: List[str], max_tokens: int) -> List[str]:
+    """
+    Pack page texts into chunks that each fit in ``max_tokens``.
+    
+    Args:
+        pages: Extracted text per page, in document order
+        max_tokens: Token budget per chunk (estimated at ~4 characters per token)
+    
+    Returns:
+        Chunk texts in document order; empty pages are dropped
+    """
+    blocks = []
+    for page in pages:
+        if page and page.strip():
+            blocks.extend(_split_oversized(page, max_tokens))
+    
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in blocks:
+        tokens = estimate_tokens(block)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -1,14 +1,150 @@
-from firebase_admin import firestore
-from datetime import datetime
+"""
+Timeline event logging through an in-process background writer.
 
-db = firestore.client()
+``log_timeline_event`` only enqueues the event; ``timeline_writer`` drains the
+queue in the background and commits events in ``WriteBatch``es of up to
+TIMELINE_BATCH_SIZE, or whatever has arrived after TIMELINE_FLUSH_SECONDS.
+The app lifespan starts the writer and flushes it on shutdown. When the queue
+is full (TIMELINE_QUEUE_MAX) new events are dropped and counted rather than
+slowing down the request that logged them.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
-async def log_timeline_event(uid: str, type: str, title: str, 
-                           description: str, icon: str = "Bot", 
+from db.firebase import db
+
+# Firestore caps a batch at 500 writes
+MAX_BATCH_SIZE = 500
+
+
+class TimelineWriter:
+    """Queue of pending timeline events, committed in batches by a background task."""
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5, max_queue: int = 10000):
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._carry: list = []
+        self._batch_full = asyncio.Event()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls) -> "TimelineWriter":
+        return cls(
+            batch_size=int(os.getenv("TIMELINE_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("TIMELINE_FLUSH_SECONDS", "0.5")),
+            max_queue=int(os.getenv("TIMELINE_QUEUE_MAX", "10000")),
+        )
+
+    def start(self):
+        """Start the background task on the running event loop (no-op if running)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and commit everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        items, self._carry = self._carry, []
+        if self._queue is not None:
+            items += self._take(self._queue.qsize())
+        for i in range(0, len(items), self.batch_size):
+            await self._commit(items[i:i + self.batch_size])
+
+    def enqueue(self, uid: str, event: Dict[str, Any]):
+        """Queue an event for writing; never blocks"""
+        self.start()
+        try:
+            self._queue.put_nowait((uid, event))
+        except asyncio.QueueFull:
+            self.dropped += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_full.set()
+
+    def _take(self, limit: int) -> list:
+        items = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _run(self):
+        while True:
+            items = []
+            try:
+                items.append(await self._queue.get())
+                if self._queue.qsize() < self.batch_size - 1:
+                    # Give more events up to flush_interval to arrive, unless a full batch is queued first
+                    self._batch_full.clear()
+                    waiter = asyncio.ensure_future(self._batch_full.wait())
+                    try:
+                        await asyncio.wait({waiter}, timeout=self.flush_interval)
+                    finally:
+                        waiter.cancel()
+                items += self._take(self.batch_size - 1)
+            except asyncio.CancelledError:
+                # Shutting down: events already taken go out with the final flush
+                self._carry = items
+                raise
+            # Shielded so shutdown waits for a batch that is mid-commit instead of abandoning it
+            self._inflight = asyncio.ensure_future(self._commit(items))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _commit(self, items: list):
+        if not items:
+            return
+        batch = db.batch()
+        for uid, event in items:
+            batch.set(db.collection("user_profiles").document(uid).collection("timeline_events").document(), event)
+        try:
+            await batch.commit()
+            self.written += len(items)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(items)
+            print(f"Failed to write {len(items)} timeline events: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+timeline_writer = TimelineWriter.from_env()
+
+
+async def log_timeline_event(uid: str, type: str, title: str,
+                           description: str, icon: str = "Bot",
                            details: list = None, mode: str = "academic"):
     """
     Log an event to the user's timeline.
-    
+
+    The event is queued and written in the background, so this returns
+    without waiting on Firestore.
+
     Args:
         uid: User ID
         type: Event type (schedule, detection, adjustment, priority, insight, roadmap, project)
@@ -26,11 +162,11 @@ async def log_timeline_event(uid: str, type: str, title: str,
             "icon": icon,
             "details": details or [],
             "mode": mode,
-            "created_at": firestore.SERVER_TIMESTAMP
+            # Stamped at enqueue time so events keep their order within a batch
+            "created_at": datetime.now(timezone.utc)
         }
-        
-        # Add to subcollection
-        db.collection("user_profiles").document(uid).collection("timeline_events").add(event_data)
-        
+
+        timeline_writer.enqueue(uid, event_data)
+
     except Exception as e:
         print(f"Failed to log timeline event: {e}")
@@ -255,7 +255,7 @@ export function AIStudyPlanner() {
                             <div className="rounded-lg border border-border bg-muted/30 p-3">
                                 <p className="text-sm">
                                     <span className="font-medium">Recommended Strategy:</span>{' '}
-                                    <span className="capitalize text-muted-foreground">{studyPlan.strategy}</span>
+                                    <span className="capitalize text-muted-foreground">{studyPlan.strategy.replace(/_/g, ' ')}</span>
                                 </p>
                             </div>
                         )}
@@ -93,6 +93,7 @@ export function AssessmentModal({
           subject: exam.subject,
           topics: syllabusNames,
           set_number: 1, // Standardize to 1
+          uid: user?.uid, // Lets the backend skip questions already seen
         }),
       });
 
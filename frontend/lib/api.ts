@@ -23,7 +23,7 @@ export interface StudyPlanResponse {
         total_hours: number;
         priority_topics: string[];
     } | null;
-    strategy: string | null;
+    strategy: 'cram_mode' | 'intensify' | 'normal' | null;
     message: string;
 }
 